@@ -6,6 +6,9 @@ from flask import Flask
 from flask_wtf.csrf import CSRFProtect
 from dotenv import load_dotenv
 from .extensions import db, csrf
+from .extensions.sqlite import configure_sqlite
+from utils.metrics import METRICS_ENABLED, metrics
+from .extensions.profiler import PROFILER_ENABLED, profiler
 from .config import DevConfig
 
 def create_app(config_class=DevConfig):
@@ -21,12 +24,31 @@ def create_app(config_class=DevConfig):
     # Initialize extensions
     db.init_app(app)
     csrf.init_app(app)
+
+    # WAL + tuned pragmas when running on SQLite
+    with app.app_context():
+        configure_sqlite(db.engine)
+        if METRICS_ENABLED:
+            metrics.init_app(app, db.engine)
+        # Per-request latency / SQL profiling (off by default)
+        if PROFILER_ENABLED:
+            profiler.init_app(app, db.engine)
     
     # Register blueprints
     from .routes.main import main_bp
     from .routes.probes import probes_bp
+    from .routes.history import history_bp
+    from .routes.export import export_bp
     app.register_blueprint(main_bp)
     app.register_blueprint(probes_bp)
+    app.register_blueprint(history_bp)
+    app.register_blueprint(export_bp)
+    if METRICS_ENABLED:
+        from .routes.metrics import metrics_bp
+        app.register_blueprint(metrics_bp)
+    if PROFILER_ENABLED:
+        from .routes.profiler import profiler_bp
+        app.register_blueprint(profiler_bp)
     
     # Initialize sensors ONCE at startup
     with app.app_context():
@@ -42,5 +64,9 @@ def create_app(config_class=DevConfig):
     # Start sensor background task
     from .tasks.sensor_loop import start_sensor_loop
     start_sensor_loop(app)
+
+    # Start rollup background job (minute/hour/day aggregates of sensor_readings)
+    from .tasks.rollups import start_rollup_job
+    start_rollup_job(app)
     
     return app
\ No newline at end of file
@@ -1,24 +1,34 @@
 import os
 from dotenv import load_dotenv
+from app.extensions.sqlite import is_sqlite, sqlite_engine_options
 
 load_dotenv()
 
+# Connection pool for a database server (PostgreSQL)
+SERVER_ENGINE_OPTIONS = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_pre_ping': True,
+    'pool_recycle': 3600
+}
+
+def engine_options(uri):
+    """Pool settings to match the backend - SQLite gets its own profile"""
+    return sqlite_engine_options() if is_sqlite(uri) else SERVER_ENGINE_OPTIONS
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'fallback-dev-secret')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     WTF_CSRF_ENABLED = True
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 10,
-        'max_overflow': 20,
-        'pool_pre_ping': True,
-        'pool_recycle': 3600
-    }
+    SQLALCHEMY_ENGINE_OPTIONS = SERVER_ENGINE_OPTIONS
 
 class DevConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///dev.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     TEMPLATES_AUTO_RELOAD = True
 
 class ProdConfig(Config):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
@@ -0,0 +1,204 @@
+"""
+Request profiler (PROFILER_ENABLED=true): latency, SQL count and SQL time per
+request, slow-request and N+1 flags, and the query patterns behind them.
+
+Per request it costs two perf_counter() calls per SQL statement plus a cached
+fingerprint lookup, so it is cheap enough to leave on. Latency, query and
+slow/N+1 counts go into utils.metrics (so /metrics shows them per endpoint);
+the per-route query patterns and the slowest requests are shared through the
+same per-pid files and served merged at /debug/profiler.
+
+A statement's fingerprint is its SQL with bound parameters and expanded IN
+lists collapsed, so "SELECT ... WHERE probe_id = ?" run once per probe shows
+up as one pattern with a high count - that is what the N+1 check looks for.
+Streamed responses (/api/stream, /api/export) are skipped: they outlive the
+request and would only measure how long the client stayed connected.
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("app")
+
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+PROFILER_SLOW_MS = float(os.getenv('PROFILER_SLOW_MS', '500'))
+PROFILER_N_PLUS_ONE = int(os.getenv('PROFILER_N_PLUS_ONE', '10'))  # same pattern this many times in one request
+PROFILER_MAX_PATTERNS = 50   # kept per endpoint; the rest are counted under '(other)'
+PROFILER_SLOW_LOG = 50       # slowest recent requests kept per process
+
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,?)+\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_ALIAS = re.compile(r'\s+AS\s+\w+', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """SQL with literals, column aliases and IN-list lengths normalised away"""
+    text = _LITERAL.sub('?', statement)
+    text = _IN_LIST.sub('(?)', text)
+    text = _ALIAS.sub('', text)
+    return _SPACE.sub(' ', text).strip()[:500]
+
+
+class RequestProfiler:
+    """Per-endpoint aggregates and a slow-request log for this process."""
+
+    def __init__(self, slow_ms: float = PROFILER_SLOW_MS, n_plus_one: int = PROFILER_N_PLUS_ONE):
+        self.slow_ms = slow_ms
+        self.n_plus_one = n_plus_one
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict] = {}
+        self._slow = deque(maxlen=PROFILER_SLOW_LOG)
+
+    # =============================
+    # SQLALCHEMY HOOKS
+    # =============================
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and has_request_context() and 'profile' in g:
+            # On the execution context, so a statement that raises takes its start time with it
+            context._profiler_start = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_profiler_start', None)
+        if started is None or not has_request_context() or 'profile' not in g:
+            return
+        elapsed = time.perf_counter() - started
+        context._profiler_start = None
+        profile = g.profile
+        profile['queries'] += 1
+        profile['sql_secs'] += elapsed
+        pattern = profile['patterns'].setdefault(fingerprint(statement), [0, 0.0])
+        pattern[0] += 1
+        pattern[1] += elapsed
+
+    # =============================
+    # FLASK HOOKS
+    # =============================
+    def _before_request(self):
+        g.profile = {'started': time.perf_counter(), 'queries': 0, 'sql_secs': 0.0, 'patterns': {}}
+
+    def _after_request(self, response):
+        profile = g.pop('profile', None)
+        if profile is None or response.is_streamed:
+            return response
+        elapsed = time.perf_counter() - profile['started']
+        endpoint = request.endpoint or '(unmatched)'
+        self.record(endpoint, request.method, request.full_path.rstrip('?'), response.status_code,
+                    elapsed, profile['queries'], profile['sql_secs'], profile['patterns'])
+        return response
+
+    def record(self, endpoint: str, method: str, path: str, status: int, elapsed: float,
+               queries: int, sql_secs: float, patterns: Dict[str, List]):
+        elapsed_ms = elapsed * 1000
+        slow = elapsed_ms >= self.slow_ms
+        repeated = [(sql, count) for sql, (count, _) in patterns.items() if count >= self.n_plus_one]
+
+        metrics.observe('http_request_seconds', elapsed, endpoint=endpoint)
+        metrics.observe('http_request_queries', queries, endpoint=endpoint)
+        metrics.observe('http_request_sql_seconds', sql_secs, endpoint=endpoint)
+        if slow:
+            metrics.inc('http_slow_requests_total', endpoint=endpoint)
+            logger.warning(f"Slow request: {method} {path} {elapsed_ms:.0f}ms, "
+                           f"{queries} queries ({sql_secs * 1000:.0f}ms in SQL)")
+        if repeated:
+            metrics.inc('http_n_plus_one_total', endpoint=endpoint)
+            for sql, count in repeated:
+                logger.warning(f"Possible N+1 in {endpoint}: {count}x {sql}")
+
+        with self._lock:
+            route = self._routes.get(endpoint)
+            if route is None:
+                route = self._routes[endpoint] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'queries': 0,
+                                                  'sql_ms': 0.0, 'slow': 0, 'n_plus_one': 0, 'patterns': {}}
+            route['count'] += 1
+            route['total_ms'] += elapsed_ms
+            route['max_ms'] = max(route['max_ms'], elapsed_ms)
+            route['queries'] += queries
+            route['sql_ms'] += sql_secs * 1000
+            route['slow'] += slow
+            route['n_plus_one'] += bool(repeated)
+            for sql, (count, secs) in patterns.items():
+                if sql not in route['patterns'] and len(route['patterns']) >= PROFILER_MAX_PATTERNS:
+                    sql = '(other)'
+                totals = route['patterns'].setdefault(sql, [0, 0.0])
+                totals[0] += count
+                totals[1] += secs * 1000
+            if slow or repeated:
+                self._slow.append({
+                    'endpoint': endpoint, 'method': method, 'path': path, 'status': status,
+                    'ms': round(elapsed_ms, 1), 'queries': queries, 'sql_ms': round(sql_secs * 1000, 1),
+                    'n_plus_one': [{'sql': sql, 'count': count} for sql, count in repeated],
+                    'time': time.time(),
+                })
+
+    def section(self) -> Dict:
+        with self._lock:
+            return {'routes': {endpoint: dict(route, patterns=dict(route['patterns']))
+                               for endpoint, route in self._routes.items()},
+                    'slow': list(self._slow)}
+
+    # =============================
+    # REPORT
+    # =============================
+    def report(self, limit: int = 10) -> Dict:
+        """Slowest routes (every worker merged) with their heaviest query patterns, plus recent slow requests"""
+        routes: Dict[str, Dict] = {}
+        slow: List[Dict] = []
+        for section in metrics.sections('profiler'):
+            slow.extend(section['slow'])
+            for endpoint, route in section['routes'].items():
+                merged = routes.setdefault(endpoint, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'queries': 0,
+                                                      'sql_ms': 0.0, 'slow': 0, 'n_plus_one': 0, 'patterns': {}})
+                for key in ('count', 'total_ms', 'queries', 'sql_ms', 'slow', 'n_plus_one'):
+                    merged[key] += route[key]
+                merged['max_ms'] = max(merged['max_ms'], route['max_ms'])
+                for sql, (count, ms) in route['patterns'].items():
+                    totals = merged['patterns'].setdefault(sql, [0, 0.0])
+                    totals[0] += count
+                    totals[1] += ms
+
+        ranked = []
+        for endpoint, route in routes.items():
+            count = route['count']
+            patterns = sorted(route['patterns'].items(), key=lambda p: p[1][1], reverse=True)[:limit]
+            ranked.append({
+                'endpoint': endpoint,
+                'requests': count,
+                'avg_ms': round(route['total_ms'] / count, 1),
+                'max_ms': round(route['max_ms'], 1),
+                'avg_queries': round(route['queries'] / count, 1),
+                'avg_sql_ms': round(route['sql_ms'] / count, 1),
+                'slow': route['slow'],
+                'n_plus_one': route['n_plus_one'],
+                'patterns': [{'sql': sql, 'per_request': round(calls / count, 1), 'total_ms': round(ms, 1)}
+                             for sql, (calls, ms) in patterns],
+            })
+        ranked.sort(key=lambda r: r['avg_ms'], reverse=True)
+        slow.sort(key=lambda r: r['ms'], reverse=True)
+        return {'slow_ms': self.slow_ms, 'n_plus_one': self.n_plus_one,
+                'routes': ranked[:limit], 'slow_requests': slow[:limit]}
+
+    # =============================
+    # SETUP
+    # =============================
+    def init_app(self, app, engine):
+        """Hook the app's requests and `engine`'s statements (call once, in create_app)"""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if not event.contains(engine, 'before_cursor_execute', self._before_execute):
+            event.listen(engine, 'before_cursor_execute', self._before_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_execute)
+        metrics.add_section('profiler', self.section)
+        logger.info(f"Request profiler on (slow >= {self.slow_ms:.0f}ms, N+1 >= {self.n_plus_one} repeats)")
+
+
+profiler = RequestProfiler()
@@ -0,0 +1,53 @@
+"""
+SQLite profile for single-board deployments (DATABASE_URL=sqlite:///...).
+
+WAL lets gunicorn workers keep reading while the sensor loop commits - readers
+see the last committed snapshot instead of waiting on the writer's lock.
+synchronous=NORMAL is safe under WAL (a power cut can lose the last commit,
+never corrupt the file), and busy_timeout makes the rare writer/writer clash
+wait instead of failing with "database is locked".
+"""
+import os
+from sqlalchemy import event
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_CACHE_KB = int(os.getenv('SQLITE_CACHE_KB', '16384'))   # page cache per connection
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', '5'))
+
+def is_sqlite(uri):
+    return bool(uri) and uri.startswith('sqlite')
+
+def sqlite_engine_options():
+    """
+    A few long-lived connections per process (each keeps its own page cache warm).
+    No pre-ping or recycle: the "server" is a local file that can't drop the connection.
+    """
+    return {
+        'pool_size': SQLITE_POOL_SIZE,
+        'max_overflow': SQLITE_POOL_SIZE,
+        'pool_timeout': 30,
+        'connect_args': {
+            'check_same_thread': False,                  # pooled connections move between threads
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+        },
+    }
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")        # persistent, stored in the file
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+def configure_sqlite(engine):
+    """Apply the pragmas to every new connection of `engine` (no-op for other databases)"""
+    if engine.dialect.name != 'sqlite' or event.contains(engine, 'connect', _apply_pragmas):
+        return
+    if engine.url.database in (None, '', ':memory:'):
+        return  # in-memory DBs have no WAL
+    event.listen(engine, 'connect', _apply_pragmas)
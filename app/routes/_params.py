@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+from flask import jsonify
+
+# =============================
+# SHARED QUERY-STRING HELPERS
+# =============================
+# Used by the /api/history and /api/export routes.
+
+def bad_request(message):
+    response = jsonify({'error': message})
+    response.status_code = 400
+    return response
+
+def parse_time(value, default):
+    """ISO 8601 query parameter -> naive UTC datetime (`default` when missing)"""
+    if not value:
+        return default
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    # Stored timestamps are naive UTC
+    return parsed.replace(tzinfo=None) - (parsed.utcoffset() or timedelta(0))
@@ -0,0 +1,41 @@
+from datetime import datetime
+from flask import Blueprint, Response, request, stream_with_context
+from app.extensions import db
+from app.routes._params import bad_request, parse_time
+from utils.export import FORMATS, export_stream
+
+export_bp = Blueprint('export', __name__, url_prefix='/api')
+
+@export_bp.route('/export')
+def export():
+    """
+    /api/export?[probe=<name>[,<name>...]][&type=<sensor_type>][&from=<iso>][&to=<iso>][&format=csv|ndjson][&gzip=1]
+    Streams matching readings oldest first; memory use is the same for a day or a season.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return bad_request(f"format must be one of {sorted(FORMATS)}")
+    try:
+        start = parse_time(request.args.get('from'), None)
+        end = parse_time(request.args.get('to'), None)
+    except ValueError as e:
+        return bad_request(f"invalid parameter: {e}")
+    if start and end and start >= end:
+        return bad_request("need from < to")
+
+    probes = [p.strip() for p in request.args.get('probe', '').split(',') if p.strip()]
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    filters = dict(sensor_type=request.args.get('type') or None, probes=probes or None, start=start, end=end)
+
+    def generate():
+        # Own connection for the server-side cursor, held only while the body streams
+        with db.engine.connect() as conn:
+            yield from export_stream(conn, fmt, compress, **filters)
+
+    mimetype, extension = FORMATS[fmt]
+    filename = f"readings-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    if compress:
+        mimetype, filename = 'application/gzip', filename + '.gz'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                             'X-Accel-Buffering': 'no'})
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+import numpy as np
+from flask import Blueprint, jsonify, request
+from app.extensions import db
+from app.routes._params import bad_request, parse_time
+from models.probes import Probe, PROBE_READING_TYPES
+from models.rollups import RESOLUTIONS, RollupWatermark, SensorRollup, bucket_start, pick_resolution
+from app.tasks.retention import is_retained
+from app.tasks.rollups import WATERMARK_NAME
+from models.sensor_data import SensorReading
+from utils.archive import archive
+from utils.downsample import lttb, minmax
+
+history_bp = Blueprint('history', __name__, url_prefix='/api')
+
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+DEFAULT_SPAN = timedelta(hours=24)
+
+DOWNSAMPLERS = {
+    'lttb': lttb,
+    'minmax': minmax,
+}
+
+def load_series(reading_type, probe, start, end, points):
+    """
+    (source, timestamps as datetime64[s] UTC, values, mins, maxs) for one probe over [start, end).
+    Reads the coarsest rollup that still gives `points` buckets; raw rows only
+    when the range is too short for any rollup to have enough buckets (merged
+    with the columnar archive for older ranges). Levels already pruned by
+    retention for `start` are skipped. Rollups trail raw rows by up to
+    ROLLUP_INTERVAL, so readings above the rollup watermark are folded into
+    their buckets on the fly.
+    """
+    resolution = pick_resolution(start, end, points)
+    # Finer levels may already be pruned for old ranges - step up to one that is still kept
+    levels = [None] + list(RESOLUTIONS)
+    level = levels.index(resolution)
+    while level < len(levels) - 1 and not is_retained(levels[level] or 'raw', start):
+        level += 1
+    resolution = levels[level]
+    if resolution:
+        buckets = {r.bucket: [r.min_value, r.max_value, r.sum_value, r.count]
+                   for r in SensorRollup.series(resolution, reading_type, probe, start, end)}
+        watermark = db.session.get(RollupWatermark, WATERMARK_NAME)
+        pending = db.session.query(SensorReading.timestamp, SensorReading.value).filter(
+            SensorReading.id > (watermark.last_id if watermark else 0),
+            SensorReading.sensor_type == reading_type,
+            SensorReading.probe_id == probe,
+            SensorReading.timestamp >= start,
+            SensorReading.timestamp < end,
+            SensorReading.value.isnot(None),
+        ).all()
+        for ts, value in pending:
+            agg = buckets.setdefault(bucket_start(ts, resolution), [value, value, 0.0, 0])
+            agg[0], agg[1] = min(agg[0], value), max(agg[1], value)
+            agg[2] += value
+            agg[3] += 1
+
+        order = sorted(buckets)
+        aggs = [buckets[b] for b in order]
+        t = np.array(order, dtype='datetime64[s]')
+        return (f"rollup:{resolution}" + ("+raw" if pending else ""), t,
+                np.array([total / count if count else np.nan for _, _, total, count in aggs], dtype=np.float64),
+                np.array([mn for mn, _, _, _ in aggs], dtype=np.float64),
+                np.array([mx for _, mx, _, _ in aggs], dtype=np.float64))
+
+    rows = db.session.query(SensorReading.timestamp, SensorReading.value).filter(
+        SensorReading.sensor_type == reading_type,
+        SensorReading.probe_id == probe,
+        SensorReading.timestamp >= start,
+        SensorReading.timestamp < end,
+        SensorReading.value.isnot(None),
+    ).order_by(SensorReading.timestamp).all()
+    t = np.array([ts for ts, _ in rows], dtype='datetime64[s]')
+    v = np.fromiter((value for _, value in rows), dtype=np.float64, count=len(rows))
+
+    # Older readings live in the memory-mapped columnar archive
+    archived_t, archived_v = archive.read(reading_type, probe, start, end)
+    if len(archived_t):
+        t = np.concatenate((archived_t, t))
+        v = np.concatenate((archived_v, v))
+        order = np.argsort(t, kind='stable')
+        return "raw+archive", t[order], v[order], None, None
+    return "raw", t, v, None, None
+
+@history_bp.route('/history')
+def history():
+    """
+    /api/history?probe=<name>&from=<iso>&to=<iso>&points=<n>[&type=<sensor_type>][&method=lttb|minmax]
+    Any time range for one probe, downsampled server-side to at most `points` points.
+    """
+    probe = request.args.get('probe', '').strip()
+    if not probe:
+        return bad_request("probe is required")
+
+    try:
+        end = parse_time(request.args.get('to'), datetime.utcnow())
+        start = parse_time(request.args.get('from'), end - DEFAULT_SPAN)
+        points = min(int(request.args.get('points', DEFAULT_POINTS)), MAX_POINTS)
+    except ValueError as e:
+        return bad_request(f"invalid parameter: {e}")
+    if start >= end or points < 3:
+        return bad_request("need from < to and points >= 3")
+
+    method = request.args.get('method', 'lttb')
+    if method not in DOWNSAMPLERS:
+        return bad_request(f"method must be one of {sorted(DOWNSAMPLERS)}")
+
+    reading_type = request.args.get('type')
+    if not reading_type:
+        probe_row = Probe.query.filter_by(name=probe).first()
+        if probe_row is None:
+            return bad_request(f"unknown probe '{probe}' - pass type= for removed probes")
+        reading_type = PROBE_READING_TYPES.get(probe_row.sensor_type, probe_row.sensor_type)
+
+    source, t, v, mins, maxs = load_series(reading_type, probe, start, end, points)
+    x = t.astype(np.int64).astype(np.float64)  # epoch seconds for the triangle maths
+    keep = DOWNSAMPLERS[method](x, v, points) if len(t) > points else np.arange(len(t))
+
+    payload = {
+        'probe': probe,
+        'type': reading_type,
+        'from': start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'to': end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'source': source,
+        'method': method,
+        'rows': int(len(t)),
+        'points': int(len(keep)),
+        't': [f"{ts}Z" for ts in np.datetime_as_string(t[keep], unit='s')],
+        'v': np.round(v[keep], 2).tolist(),
+    }
+    if mins is not None:
+        payload['min'] = np.round(mins[keep], 2).tolist()
+        payload['max'] = np.round(maxs[keep], 2).tolist()
+    return jsonify(payload)
@@ -1,77 +1,290 @@
-from flask import Blueprint, render_template, jsonify
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from flask import Blueprint, Response, render_template, jsonify, current_app, request
 from app.extensions import db 
-from models.sensor_data import SensorReading
+from models.sensor_data import LATEST_LOOKBACK, SensorReading
 from models.alerts import Alert
+from models.probes import Probe, PROBE_READING_TYPES
+from sensors.registry import registry
+from utils.latest_store import latest_store
 from utils.sensor_utils import format_light_level, format_moisture, format_temperature
 
 main_bp = Blueprint('main', __name__)
 
+READINGS_WINDOW = 20  # points per chart
+STREAM_POLL_SECS = 1.0      # how often each /api/stream connection checks the latest store (one stat())
+STREAM_HEARTBEAT_SECS = 15  # comment frame so proxies keep idle streams open
+STREAM_MAX_SECS = 1800      # end the stream now and then; EventSource reconnects on its own
+
+# SensorReading.sensor_type -> key prefix used in the /api/readings payload
+SERIES = {
+    'soil_moisture': ('soil', 'soil_moisture', format_moisture),
+    'temperature': ('temp', 'temperature', format_temperature),
+    'light': ('light', 'light', format_light_level),
+}
+
+# =============================
+# PER-CYCLE READINGS CACHE
+# =============================
+# Readings only change once per sensor cycle, so the window query and its JSON
+# are built once per cycle and reused by every poll. The sensor loop publishes
+# each cycle to the shared latest-value store, so telling whether anything
+# changed - and the current level/status fields - costs no DB query.
+_readings_cache = {'marker': None, 'latest': None, 'body': None}
+_readings_lock = threading.Lock()
+
+def _readings_marker(snapshot):
+    """Cycle marker from the latest store; falls back to max(id) (index-only) if the collector hasn't published"""
+    if snapshot:
+        return ('store', snapshot.get('reading_id'), snapshot['pid'], snapshot['seq'], latest_store.is_fresh(snapshot))
+    return ('db', db.session.query(db.func.max(SensorReading.id)).scalar())
+
+def _cached_readings(snapshot=None, marker=None):
+    """Returns (latest {sensor_type: value}, serialized /api/readings body), rebuilt only on a new cycle"""
+    if marker is None:
+        snapshot = latest_store.read()
+        marker = _readings_marker(snapshot)
+    with _readings_lock:
+        if _readings_cache['body'] is not None and _readings_cache['marker'] == marker:
+            return _readings_cache['latest'], _readings_cache['body']
+
+    # One query for the last N rows of every sensor type
+    rows = SensorReading.latest_window(READINGS_WINDOW, list(SERIES))
+    cutoff = datetime.utcnow() - LATEST_LOOKBACK  # older rows are last-known values, not Online
+    grouped = {sensor_type: [] for sensor_type in SERIES}
+    for sensor_type, _, value, timestamp in rows:
+        grouped[sensor_type].append((value, timestamp))
+
+    payload = {}
+    latest = {}
+    for sensor_type, (prefix, data_key, fmt) in SERIES.items():
+        vals = grouped[sensor_type]
+        payload[data_key] = [v for v, _ in vals]
+        payload[f"{prefix}_labels"] = [ts.strftime("%H:%M:%S") for _, ts in vals]
+
+        if snapshot:
+            # Current level/status straight from the collector's last cycle
+            probe_values = snapshot['readings'].get(sensor_type) or {}
+            current = list(probe_values.values())[-1] if probe_values else None
+            online = latest_store.is_fresh(snapshot) and current is not None
+        else:
+            current = vals[-1][0] if vals else None
+            online = bool(vals and vals[-1][1] and vals[-1][1] >= cutoff)
+
+        latest[sensor_type] = current
+        payload[f"{prefix}_status"] = "Online" if online else "Offline"
+        payload[f"{prefix}_current"] = fmt(current)
+
+    body = json.dumps(payload)
+    with _readings_lock:
+        _readings_cache.update(marker=marker, latest=latest, body=body)
+    return latest, body
+
+# =============================
+# PER-PROBE SERIES
+# =============================
+# Charts are driven by the Probe table: one dataset per active probe, every
+# probe's last N points from ONE window query partitioned by (type, probe).
+# Cached per cycle like /api/readings, and also keyed on the probe registry
+# stamp so adding/removing a probe shows up without waiting for a cycle.
+_probes_cache = {'key': None, 'body': None}
+
+def _probe_series(snapshot, marker):
+    """Serialized /api/readings/probes body, rebuilt only on a new cycle or probe change"""
+    key = (marker, registry.stamp())
+    with _readings_lock:
+        if _probes_cache['body'] is not None and _probes_cache['key'] == key:
+            return _probes_cache['body']
+
+    probes = Probe.query.filter_by(active=True).order_by(Probe.name).all()
+    rows = SensorReading.latest_window(READINGS_WINDOW, list(SERIES), by_probe=True)
+    cutoff = datetime.utcnow() - LATEST_LOOKBACK
+    grouped = {}
+    for sensor_type, probe_id, value, timestamp in rows:
+        grouped.setdefault((sensor_type, probe_id), {})[timestamp] = value
+
+    fresh = latest_store.is_fresh(snapshot)
+    payload = {'series': {}}
+    for sensor_type, (prefix, _, fmt) in SERIES.items():
+        type_probes = [p for p in probes if PROBE_READING_TYPES.get(p.sensor_type, p.sensor_type) == sensor_type]
+        # Shared x axis: every timestamp any of this type's probes has in its window
+        times = sorted({ts for p in type_probes for ts in grouped.get((sensor_type, p.name), {})})[-READINGS_WINDOW:]
+        live = (snapshot['readings'].get(sensor_type) or {}) if snapshot else {}
+
+        series = []
+        for probe in type_probes:
+            points = grouped.get((sensor_type, probe.name), {})
+            values = [points.get(ts) for ts in times]  # None where the probe missed a cycle
+            if snapshot:
+                current = live.get(probe.name)
+                online = fresh and current is not None
+            else:
+                current = next((v for v in reversed(values) if v is not None), None)
+                online = current is not None and max(points) >= cutoff
+            series.append({
+                'probe': probe.name,
+                'description': probe.description or '',
+                'values': values,
+                'current': fmt(current),
+                'status': "Online" if online else "Offline",
+            })
+
+        payload['series'][sensor_type] = series
+        payload[f"{prefix}_labels"] = [ts.strftime("%H:%M:%S") for ts in times]
+        # Same summary fields as /api/readings, so one response drives the whole page
+        if snapshot:
+            current = list(live.values())[-1] if live else None
+        else:
+            current = next((v for p in reversed(series) for v in reversed(p['values']) if v is not None), None)
+        payload[f"{prefix}_status"] = "Online" if any(p['status'] == "Online" for p in series) else "Offline"
+        payload[f"{prefix}_current"] = fmt(current)
+
+    body = json.dumps(payload)
+    with _readings_lock:
+        _probes_cache.update(key=key, body=body)
+    return body
+
+# =============================
+# CONDITIONAL GET
+# =============================
+def _not_modified(etag, last_modified=None):
+    """304 response if the client's If-None-Match / If-Modified-Since still matches, else None"""
+    if request.if_none_match:
+        matched = request.if_none_match.contains(etag)
+    else:
+        since = request.if_modified_since
+        matched = bool(since and last_modified and int(last_modified.timestamp()) <= int(since.timestamp()))
+    if not matched:
+        return None
+    response = current_app.response_class(status=304)
+    _set_validators(response, etag, last_modified)
+    return response
+
+def _set_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'  # always revalidate, but 304s are nearly free
+    return response
+
+def _utc(text):
+    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc) if text else None
+
 @main_bp.route('/')
 def index():
-    soil = SensorReading.query.filter_by(sensor_type='soil_moisture').order_by(SensorReading.timestamp.desc()).first()
-    temp = SensorReading.query.filter_by(sensor_type='temperature').order_by(SensorReading.timestamp.desc()).first()
-    light_val = SensorReading.query.filter_by(sensor_type='light').order_by(SensorReading.timestamp.desc()).first()
+    snapshot = latest_store.read()
+    if snapshot:
+        # Latest values from the collector's shared store - no DB query
+        latest = {t: (list(v.values())[-1] if v else None) for t, v in snapshot['readings'].items()}
+    else:
+        latest, _ = _cached_readings()
     
     return render_template("index.html",
-                          soil=soil.value if soil else None,
-                          temp=temp.value if temp else None,
-                          light=light_val.value if light_val else None)
+                          soil=latest.get('soil_moisture'),
+                          temp=latest.get('temperature'),
+                          light=latest.get('light'))
 
 @main_bp.route("/alerts")
 def get_alerts():
+    # Validators from the collector's store (no query); max(id) is the fallback
+    snapshot = latest_store.read()
+    if snapshot and 'alert_id' in snapshot:
+        alert_id, last_modified = snapshot['alert_id'], _utc(snapshot.get('alert_time'))
+    else:
+        alert_id, newest = db.session.query(db.func.max(Alert.id), db.func.max(Alert.timestamp)).one()
+        last_modified = newest.replace(tzinfo=timezone.utc) if newest else None
+    etag = f"a{alert_id}"
+
+    not_modified = _not_modified(etag, last_modified)
+    if not_modified:
+        return not_modified
+
     alerts = Alert.query.order_by(Alert.timestamp.desc()).limit(10).all()
-    return jsonify([{
+    response = jsonify([{
         "time": a.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
         "type": a.alert_type,
         "sensor": a.sensor_name,
         "value": a.value
     } for a in alerts])
+    return _set_validators(response, etag, last_modified)
 
 @main_bp.route('/api/readings')
 def readings():
-    N = 20
-    soil_vals = SensorReading.query \
-        .filter_by(sensor_type='soil_moisture') \
-        .order_by(SensorReading.timestamp.desc()) \
-        .limit(N).all()[::-1]
-
-    temp_vals = SensorReading.query \
-        .filter_by(sensor_type='temperature') \
-        .order_by(SensorReading.timestamp.desc()) \
-        .limit(N).all()[::-1]
-
-    light_vals = SensorReading.query \
-        .filter_by(sensor_type='light') \
-        .order_by(SensorReading.timestamp.desc()) \
-        .limit(N).all()[::-1]
-
-    # Current values (latest readings)
-    soil_current = soil_vals[-1].value if soil_vals else None
-    temp_current = temp_vals[-1].value if temp_vals else None
-    light_current = light_vals[-1].value if light_vals else None
-
-    soil_data = [r.value for r in soil_vals]
-    soil_labels = [r.timestamp.strftime("%H:%M:%S") for r in soil_vals]
-    temp_data = [r.value for r in temp_vals]
-    temp_labels = [r.timestamp.strftime("%H:%M:%S") for r in temp_vals]
-    light_data = [r.value for r in light_vals]
-    light_labels = [r.timestamp.strftime("%H:%M:%S") for r in light_vals]
-
-    soil_status = "Online" if soil_vals and soil_vals[-1].timestamp else "Offline"
-    temp_status = "Online" if temp_vals and temp_vals[-1].timestamp else "Offline"
-    light_status = "Online" if light_vals and light_vals[-1].timestamp else "Offline"
-
-    return jsonify({
-        "soil_moisture": soil_data,
-        "soil_labels": soil_labels,
-        "soil_status": soil_status,
-        "soil_current":format_moisture(soil_current),
-        "temperature": temp_data,
-        "temp_labels": temp_labels,
-        "temp_status": temp_status,
-        "temp_current": format_temperature(temp_current),
-        "light": light_data,
-        "light_labels": light_labels,
-        "light_status": light_status,
-        "light_current": format_light_level(light_current)
-    })
+    snapshot = latest_store.read()
+    marker = _readings_marker(snapshot)
+    etag = "r" + "-".join(str(part) for part in marker[1:])
+    last_modified = datetime.fromtimestamp(snapshot['published'], timezone.utc) if snapshot else None
+
+    not_modified = _not_modified(etag, last_modified)
+    if not_modified:
+        return not_modified
+
+    _, body = _cached_readings(snapshot, marker)
+    response = current_app.response_class(body, mimetype='application/json')
+    return _set_validators(response, etag, last_modified)
+
+@main_bp.route('/api/readings/probes')
+def probe_readings():
+    """Last READINGS_WINDOW points per active probe, grouped by sensor type"""
+    snapshot = latest_store.read()
+    marker = _readings_marker(snapshot)
+    etag = "p" + "-".join(str(part) for part in marker[1:] + (registry.stamp(),))
+    last_modified = datetime.fromtimestamp(snapshot['published'], timezone.utc) if snapshot else None
+
+    not_modified = _not_modified(etag, last_modified)
+    if not_modified:
+        return not_modified
+
+    body = _probe_series(snapshot, marker)
+    response = current_app.response_class(body, mimetype='application/json')
+    return _set_validators(response, etag, last_modified)
+
+
+# =============================
+# SERVER-SENT EVENTS
+# =============================
+def _stream_frame(snapshot):
+    """Incremental frame: only this cycle's new points, keyed like /api/readings plus per-probe values"""
+    label = snapshot.get('reading_time', snapshot['time'])[11:]  # HH:MM:SS
+    fresh = latest_store.is_fresh(snapshot)
+    frame = {'seq': snapshot['seq'], 'pid': snapshot['pid'], 'time': label,
+             'probes': {sensor_type: snapshot['readings'].get(sensor_type) or {} for sensor_type in SERIES}}
+    for sensor_type, (prefix, data_key, fmt) in SERIES.items():
+        values = list((snapshot['readings'].get(sensor_type) or {}).values())
+        current = values[-1] if values else None
+        frame[data_key] = values
+        frame[f"{prefix}_labels"] = [label] * len(values)
+        frame[f"{prefix}_status"] = "Online" if fresh and current is not None else "Offline"
+        frame[f"{prefix}_current"] = fmt(current)
+    return frame
+
+@main_bp.route('/api/stream')
+def stream():
+    """
+    Pushes one `readings` event per sensor cycle (and an `alerts` event when
+    alerts open/resolve). Only watches the shared latest store, so an idle
+    dashboard costs one stat() a second and no DB queries.
+    """
+    def events():
+        snapshot = latest_store.read()
+        last = (snapshot['pid'], snapshot['seq']) if snapshot else None  # page already fetched this cycle
+        started = last_sent = time.monotonic()
+        yield "retry: 5000\n\n"
+
+        while time.monotonic() - started < STREAM_MAX_SECS:
+            snapshot = latest_store.read()
+            if snapshot and (snapshot['pid'], snapshot['seq']) != last:
+                last = (snapshot['pid'], snapshot['seq'])
+                yield f"event: readings\ndata: {json.dumps(_stream_frame(snapshot))}\n\n"
+                if snapshot.get('alert_changes'):
+                    yield f"event: alerts\ndata: {json.dumps(snapshot['alert_changes'])}\n\n"
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_SECS:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(STREAM_POLL_SECS)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
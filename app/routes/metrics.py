@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+from utils.metrics import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape target - merged across every gunicorn worker (see utils/metrics.py)"""
+    metrics.flush()  # this worker's own numbers as of now
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
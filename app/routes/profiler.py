@@ -0,0 +1,10 @@
+from flask import Blueprint, jsonify, request
+from app.extensions.profiler import profiler
+
+profiler_bp = Blueprint('profiler', __name__, url_prefix='/debug')
+
+@profiler_bp.route('/profiler')
+def profiler_report():
+    """/debug/profiler[?limit=N] - slowest routes and their query patterns, merged across workers"""
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify(profiler.report(max(1, min(limit, 100))))
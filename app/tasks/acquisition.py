@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Optional
+from sensors import soil_moisture, temperature, light
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("app")
+
+# Probe.sensor_type -> driver module. Each module declares the physical BUS it sits on.
+SENSOR_MODULES = {
+    'soil': soil_moisture,
+    'temperature': temperature,
+    'light': light,
+}
+
+# =============================
+# PER-BUS WORKERS
+# =============================
+# One single-threaded executor per physical bus: different buses overlap,
+# reads on the same bus stay serialized (the drivers are not re-entrant).
+_WORKERS: Dict[str, ThreadPoolExecutor] = {}
+_IN_FLIGHT = {}  # {bus: Future} from the previous cycle, to spot a hung bus
+
+
+def _worker(bus: str) -> ThreadPoolExecutor:
+    if bus not in _WORKERS:
+        _WORKERS[bus] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"bus-{bus}")
+    return _WORKERS[bus]
+
+
+def acquire_all(deadline_secs: float) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Read every active probe, one worker per bus, within a cycle-level deadline.
+    Returns {sensor_type: {probe_name: value or None}}. Probes that have not
+    answered when the deadline passes are reported as missing (None).
+    Must be called with an app context (probe configs may need reloading).
+    """
+    started = time.monotonic()
+    probe_names: Dict[str, list] = {}
+    results: Dict[str, Dict[str, Optional[float]]] = {}
+    futures = {}
+
+    # Group sensor types by bus so types sharing a bus share its worker
+    by_bus: Dict[str, list] = {}
+    for sensor_type, module in SENSOR_MODULES.items():
+        probe_names[sensor_type] = module.active_probes()  # registry lookup, DB only if stale
+        results[sensor_type] = {}
+        by_bus.setdefault(module.BUS, []).append(sensor_type)
+
+    for bus, sensor_types in by_bus.items():
+        previous = _IN_FLIGHT.get(bus)
+        if previous is not None and not previous.done():
+            logger.warning(f"Bus {bus} still busy from last cycle - skipping {sensor_types} this cycle")
+            metrics.inc('sensor_bus_skipped_total', bus=bus)
+            continue
+
+        def read_bus(bus=bus, sensor_types=sensor_types):
+            bus_started = time.perf_counter()
+            try:
+                for sensor_type in sensor_types:
+                    SENSOR_MODULES[sensor_type].read_all(probe_names[sensor_type], results[sensor_type])
+            finally:
+                # Recorded when the bus really finishes, even if that is after the deadline
+                metrics.observe('sensor_acquire_bus_seconds', time.perf_counter() - bus_started, bus=bus)
+
+        futures[bus] = _IN_FLIGHT[bus] = _worker(bus).submit(read_bus)
+
+    remaining = max(0.0, deadline_secs - (time.monotonic() - started))
+    wait(list(futures.values()), timeout=remaining)
+
+    for bus, future in futures.items():
+        if future.done() and future.exception() is not None:
+            logger.error(f"Bus {bus} read failed: {future.exception()}")
+
+    # Snapshot what arrived in time; anything else is missing this cycle
+    readings: Dict[str, Dict[str, Optional[float]]] = {}
+    for sensor_type, names in probe_names.items():
+        arrived = dict(results[sensor_type])
+        missing = [name for name in names if name not in arrived]
+        if missing:
+            logger.warning(f"{sensor_type} probes missed the {deadline_secs}s deadline: {missing}")
+        for name in names:
+            if arrived.get(name) is None:
+                metrics.inc('sensor_probe_failures_total', sensor_type=sensor_type, probe=name,
+                            reason='error' if name in arrived else 'timeout')
+        readings[sensor_type] = {name: arrived.get(name) for name in names}
+
+    logger.info(f"Acquired {sum(len(v) for v in readings.values())} probes "
+                f"across {len(by_bus)} buses in {time.monotonic() - started:.2f}s")
+    return readings
@@ -0,0 +1,162 @@
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from app.extensions import db
+from models.alerts import Alert
+from utils.logger import get_logger
+from utils.notifications import (ALERT_TYPES, alert_high_temperature, alert_low_light, alert_low_temperature,
+                                 alert_low_moisture, cooldowns, should_send_alert, stage_alert_sent)
+
+logger = get_logger("app")
+
+LOW_MOISTURE_THRESHOLD = 30
+HIGH_TEMP_THRESHOLD = 30
+LOW_TEMP_THRESHOLD = 0
+LOW_LIGHT_THRESHOLD = 2000
+
+
+class AlertRule(NamedTuple):
+    sensor_type: str                    # key in acquire_all() readings
+    prefix: str                         # sensor_name = f"{prefix}-{probe_name.title()}"
+    alert_type: str                     # Alert.alert_type
+    notify_key: str                     # utils.notifications.ALERT_TYPES key
+    breached: Callable[[float], bool]   # condition clears as soon as this is False
+    notify: Callable[..., None]         # alert_*(sensor_name, value, first=...)
+
+
+ALERT_RULES = [
+    AlertRule('soil', 'Soil', 'Low Moisture', 'low_soil_moisture',
+              lambda v: v <= LOW_MOISTURE_THRESHOLD, alert_low_moisture),
+    AlertRule('temperature', 'Temp', 'High Temperature', 'high_temp',
+              lambda v: v >= HIGH_TEMP_THRESHOLD, alert_high_temperature),
+    AlertRule('temperature', 'Temp', 'Low Temperature', 'low_temp',
+              lambda v: v <= LOW_TEMP_THRESHOLD, alert_low_temperature),
+    AlertRule('light', 'Light', 'Low Light', 'low_light',
+              lambda v: v <= LOW_LIGHT_THRESHOLD, alert_low_light),
+]
+
+
+class Notification(NamedTuple):
+    rule: AlertRule
+    sensor_name: str
+    value: float
+    first: bool     # first breach -> notify immediately; ongoing -> cooldown applies
+
+
+class AlertEngine:
+    """
+    In-memory alert state: {(sensor_name, alert_type): [active Alert ids]}.
+    Loaded once, then every cycle evaluates open/resolve transitions without
+    querying. New alerts are session.add()ed and resolutions go out as one
+    UPDATE, so everything lands in the caller's single per-cycle commit.
+    """
+
+    def __init__(self, rules: List[AlertRule] = ALERT_RULES):
+        self.rules = rules
+        self.active: Dict[Tuple[str, str], List[Optional[int]]] = {}
+        self.loaded = False
+        self._opened: List[Tuple[Tuple[str, str], Alert]] = []
+        self.changes: List[Dict] = []   # opened/resolved in the last evaluate() - pushed to dashboards
+        self.last_alert_id: Optional[int] = None      # newest alerts.id - /alerts ETag
+        self.last_alert_time: Optional[datetime] = None
+
+    def load(self):
+        """Read every active alert once (startup, or after a failed cycle)"""
+        rows = db.session.query(Alert.id, Alert.sensor_name, Alert.alert_type) \
+            .filter(Alert.status == 'active').all()
+        self.active = {}
+        for alert_id, sensor_name, alert_type in rows:
+            self.active.setdefault((sensor_name, alert_type), []).append(alert_id)
+        self.last_alert_id, self.last_alert_time = db.session.query(
+            db.func.max(Alert.id), db.func.max(Alert.timestamp)).one()
+        self.loaded = True
+        logger.info(f"Alert engine loaded {len(rows)} active alerts")
+
+    def reset(self):
+        """Forget in-memory state - call after a rollback so the next cycle reloads"""
+        self.loaded = False
+        self._opened = []
+
+    def evaluate(self, readings: Dict[str, Dict[str, Optional[float]]]) -> List[Notification]:
+        """
+        Apply this cycle's readings. Stages new/resolved alerts on db.session
+        (no commit) and returns the notifications to send once it is committed.
+        """
+        if not self.loaded:
+            self.load()
+
+        notifications: List[Notification] = []
+        resolved_ids: List[int] = []
+        self.changes = []
+
+        for rule in self.rules:
+            for probe_name, value in readings.get(rule.sensor_type, {}).items():
+                # Skip if sensor failed to read (None = hardware/sensor error)
+                if value is None:
+                    continue
+
+                sensor_name = f"{rule.prefix}-{probe_name.title()}"
+                key = (sensor_name, rule.alert_type)
+
+                if rule.breached(value):
+                    if key not in self.active:
+                        # FIRST TIME BREACH: open alert, id known after flush()
+                        alert = Alert(alert_type=rule.alert_type, sensor_name=sensor_name, value=value)
+                        db.session.add(alert)
+                        self._opened.append((key, alert))
+                        self.active[key] = [None]
+                        notifications.append(Notification(rule, sensor_name, value, True))
+                        self.changes.append({'type': rule.alert_type, 'sensor': sensor_name, 'value': value, 'state': 'opened'})
+                    else:
+                        # ONGOING BREACH: cooldown decides whether to email again
+                        notifications.append(Notification(rule, sensor_name, value, False))
+
+                elif key in self.active:
+                    # CONDITION RESOLVED: reading back to normal
+                    resolved_ids.extend(i for i in self.active.pop(key) if i is not None)
+                    self.changes.append({'type': rule.alert_type, 'sensor': sensor_name, 'value': value, 'state': 'resolved'})
+                    logger.info(f"Alert resolved: {rule.alert_type} on {sensor_name} ({value})")
+
+        if resolved_ids:
+            Alert.query.filter(Alert.id.in_(resolved_ids)) \
+                .update({'status': 'resolved'}, synchronize_session=False)
+
+        return notifications
+
+    def flush(self):
+        """Flush the session and record ids of alerts opened this cycle"""
+        db.session.flush()
+        for key, alert in self._opened:
+            if key in self.active:
+                self.active[key] = [alert.id]
+            self.last_alert_id = max(self.last_alert_id or 0, alert.id)
+            self.last_alert_time = alert.timestamp
+        self._opened = []
+
+    def stage_notifications(self, notifications: List[Notification]) -> List[Tuple[Notification, datetime]]:
+        """
+        Pick the notifications that are due (first breach, or cooldown passed) and stage
+        their last_notified stamps on db.session - one UPDATE per alert type however many
+        sensors breached - so they land in the cycle's one commit. A DB error propagates
+        to the cycle's rollback. Returns (notification, stamp) pairs for notify() once
+        that commit succeeds.
+        """
+        due = []
+        now = datetime.utcnow()
+        by_key: Dict[str, List[str]] = {}
+        for n in notifications:
+            if n.first or should_send_alert(n.sensor_name, n.rule.notify_key):
+                by_key.setdefault(n.rule.notify_key, []).append(n.sensor_name)
+                due.append((n, now))
+        for notify_key, sensor_names in by_key.items():
+            stage_alert_sent(sensor_names, notify_key, now)
+        return due
+
+    def notify(self, due: List[Tuple[Notification, datetime]]):
+        """Send the notifications stage_notifications() stamped, once the cycle is committed"""
+        for n, stamped in due:
+            cooldowns.record(n.sensor_name, ALERT_TYPES[n.rule.notify_key], stamped)
+            try:
+                n.rule.notify(n.sensor_name, n.value, first=n.first, mark=False)
+            except Exception as e:
+                db.session.rollback()  # the cycle is committed - just don't leave an aborted transaction behind
+                logger.error(f"Notification failed for {n.sensor_name} ({n.rule.alert_type}): {e}")
@@ -0,0 +1,74 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from app.extensions import db
+from models.rollups import RollupWatermark
+from models.sensor_data import SensorReading
+from utils.archive import archive
+from utils.logger import get_logger
+
+logger = get_logger("app")
+
+# Opt-in: readings older than this move from sensor_readings into the columnar archive (0 = off)
+ARCHIVE_AFTER_DAYS = float(os.getenv('ARCHIVE_AFTER_DAYS', '0'))
+ARCHIVE_ENABLED = ARCHIVE_AFTER_DAYS > 0
+ARCHIVE_BATCH = int(os.getenv('ARCHIVE_BATCH', '20000'))
+# Archived readings older than this are deleted from the archive files (0 = keep forever)
+ARCHIVE_RETENTION_DAYS = float(os.getenv('ARCHIVE_RETENTION_DAYS', '365'))
+
+def archive_window() -> Optional[timedelta]:
+    """How far back the archive keeps readings (None = forever)"""
+    return timedelta(days=ARCHIVE_RETENTION_DAYS) if ARCHIVE_RETENTION_DAYS > 0 else None
+
+WATERMARK_NAME = 'sensor_readings'  # only rows the rollup job has already folded in
+
+def run_archive(batch_size: int = ARCHIVE_BATCH, now: Optional[datetime] = None) -> int:
+    """
+    Move readings older than ARCHIVE_AFTER_DAYS into the archive files, oldest id
+    first. Each batch is written (atomically, per month file) before its rows are
+    deleted, so a crash in between only re-archives rows the files already hold.
+    Then prunes archived readings older than ARCHIVE_RETENTION_DAYS. Returns rows moved.
+    """
+    if not ARCHIVE_ENABLED:
+        return 0
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=ARCHIVE_AFTER_DAYS)
+    watermark = db.session.get(RollupWatermark, WATERMARK_NAME)
+    max_id = watermark.last_id if watermark else 0
+
+    moved = 0
+    while True:
+        rows = db.session.query(
+            SensorReading.id, SensorReading.timestamp, SensorReading.sensor_type,
+            SensorReading.probe_id, SensorReading.value, SensorReading.device_id,
+        ).filter(SensorReading.timestamp < cutoff, SensorReading.id <= max_id) \
+         .order_by(SensorReading.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        series: Dict[Tuple, list] = {}
+        for _, ts, sensor_type, probe_id, value, device_id in rows:
+            if ts is not None and value is not None and sensor_type:
+                series.setdefault((sensor_type, probe_id, device_id), []).append((ts, value))
+        for (sensor_type, probe_id, device_id), points in series.items():
+            archive.append(sensor_type, probe_id, points, device=device_id)
+
+        # Same filter bounded by the batch's id range - exactly these rows, no huge IN list
+        db.session.query(SensorReading).filter(
+            SensorReading.timestamp < cutoff,
+            SensorReading.id.between(rows[0].id, rows[-1].id),
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        moved += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    if moved:
+        logger.info(f"Archived {moved} readings older than {cutoff:%Y-%m-%d %H:%M} to {archive.root}")
+    else:
+        db.session.commit()
+
+    window = archive_window()
+    if window is not None:
+        archive.prune(now - window)
+    return moved
@@ -0,0 +1,237 @@
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import text
+from app.extensions import db
+from models.rollups import RESOLUTIONS, SensorRollup, RollupWatermark
+from models.sensor_data import SensorReading
+from app.tasks.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_ENABLED, archive_window
+from utils.archive import archive
+from utils.logger import get_logger
+
+logger = get_logger("app")
+
+def _days(name, default):
+    """Retention in days from env; 0 or empty means keep forever (None)"""
+    days = float(os.getenv(name, default) or 0)
+    return timedelta(days=days) if days > 0 else None
+
+# How long each level of data is kept. Raw rows are only pruned once the rollup
+# job has folded them in, so history stays available at the coarser levels.
+# The raw window covers raw readings wherever they live - sensor_readings and,
+# when it is on, the columnar archive.
+RETENTION_POLICIES = {
+    'raw': _days('RETENTION_RAW_DAYS', '30'),
+    'minute': _days('RETENTION_MINUTE_DAYS', '30'),
+    'hour': _days('RETENTION_HOUR_DAYS', '730'),
+    'day': _days('RETENTION_DAY_DAYS', '0'),
+}
+
+if ARCHIVE_ENABLED and RETENTION_POLICIES['raw'] is not None \
+        and RETENTION_POLICIES['raw'] <= timedelta(days=ARCHIVE_AFTER_DAYS):
+    logger.warning(f"RETENTION_RAW_DAYS ({RETENTION_POLICIES['raw'].days}) <= ARCHIVE_AFTER_DAYS "
+                   f"({ARCHIVE_AFTER_DAYS:g}): raw readings are deleted before they are old enough to archive")
+
+# Opt-in: the scheduled job deletes history, so an upgrade never starts pruning on its own.
+# scripts/sys_scripts/prune_data.py applies the same policies on demand either way.
+RETENTION_ENABLED = os.getenv('RETENTION_ENABLED', 'false').lower() == 'true'
+RETENTION_INTERVAL_SECS = int(os.getenv('RETENTION_INTERVAL', '3600'))
+RETENTION_BATCH = int(os.getenv('RETENTION_BATCH', '2000'))
+# Gap between delete batches so the sensor loop's insert never waits long for the write lock
+RETENTION_PAUSE_SECS = float(os.getenv('RETENTION_PAUSE', '0.1'))
+
+WATERMARK_NAME = 'sensor_readings'  # same row the rollup job advances
+
+def raw_window() -> Optional[timedelta]:
+    """How far back raw readings are kept (DB + archive); the tighter of the raw policy and the archive's own limit"""
+    windows = [RETENTION_POLICIES['raw']]
+    if ARCHIVE_ENABLED:
+        windows.append(archive_window())
+    windows = [w for w in windows if w is not None]
+    return min(windows) if windows else None
+
+def describe_policy() -> str:
+    """One-line summary of the retention settings, for the startup log"""
+    levels = ", ".join(f"{level}={f'{keep.days}d' if keep else 'forever'}"
+                       for level, keep in RETENTION_POLICIES.items())
+    return f"{'on' if RETENTION_ENABLED else 'off'} ({levels}), archive {'on' if ARCHIVE_ENABLED else 'off'}"
+
+def is_retained(level: str, start: datetime, now: Optional[datetime] = None) -> bool:
+    """True if data at `level` ('raw', 'minute', ...) from `start` onwards is still kept"""
+    keep = raw_window() if level == 'raw' else RETENTION_POLICIES.get(level)
+    return keep is None or start >= (now or datetime.utcnow()) - keep
+
+# =============================
+# SIZE REPORTING
+# =============================
+def _dialect():
+    return db.engine.dialect.name
+
+def _used_bytes(tables) -> Optional[int]:
+    """
+    Bytes in use. SQLite: whole file minus free pages (freed pages land on the
+    freelist straight away). Postgres: total relation size of `tables`.
+    """
+    if _dialect() == 'sqlite':
+        page_size = db.session.execute(text("PRAGMA page_size")).scalar()
+        pages = db.session.execute(text("PRAGMA page_count")).scalar()
+        free = db.session.execute(text("PRAGMA freelist_count")).scalar()
+        return (pages - free) * page_size
+    if _dialect() == 'postgresql':
+        return sum(db.session.execute(text("SELECT pg_total_relation_size(:t)"), {'t': t}).scalar() or 0
+                   for t in tables)
+    return None
+
+def _avg_row_bytes(table) -> float:
+    """Postgres only: table size / estimated rows - DELETE frees space for reuse, not on disk"""
+    size, rows = db.session.execute(text(
+        "SELECT pg_total_relation_size(c.oid), c.reltuples FROM pg_class c WHERE c.relname = :t"
+    ), {'t': table}).one()
+    return size / rows if rows and rows > 0 else 0.0
+
+# =============================
+# POSTGRES PARTITIONS
+# =============================
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+def _drop_partitions(cutoff: datetime, max_id: int, dry_run: bool) -> Dict:
+    """
+    If sensor_readings is range-partitioned on timestamp, drop whole partitions
+    that end before the cutoff and are fully rolled up - no row-by-row deletes.
+    """
+    partitions = db.session.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), pg_total_relation_size(c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :table
+    """), {'table': SensorReading.__tablename__}).all()
+    db.session.commit()
+
+    dropped = {'partitions': [], 'rows': 0, 'bytes': 0}
+    for name, bound, size in partitions:
+        match = _UPPER_BOUND.search(bound or '')
+        try:
+            upper = datetime.fromisoformat(match.group(1)) if match else None
+        except ValueError:
+            upper = None
+        if upper is not None and upper.tzinfo is not None:
+            upper = upper.replace(tzinfo=None) - upper.utcoffset()  # stored timestamps are naive UTC
+        if upper is None or upper > cutoff:
+            continue
+        rows, newest_id = db.session.execute(text(f'SELECT count(*), max(id) FROM "{name}"')).one()
+        if newest_id is not None and newest_id > max_id:
+            continue  # not rolled up yet
+        if not dry_run:
+            db.session.execute(text(f'ALTER TABLE {SensorReading.__tablename__} DETACH PARTITION "{name}"'))
+            db.session.execute(text(f'DROP TABLE "{name}"'))
+        db.session.commit()
+        dropped['partitions'].append(name)
+        dropped['rows'] += rows
+        dropped['bytes'] += size
+        logger.info(f"Retention: dropped partition {name} ({rows} rows, {size} bytes)")
+    return dropped
+
+# =============================
+# BATCHED DELETES
+# =============================
+def _delete_batches(model, time_column, cutoff, extra_filters, batch_size, dry_run) -> int:
+    """
+    Delete rows older than cutoff, oldest id first, batch_size per transaction.
+    Each batch is a short SELECT ids + DELETE over that id range and a commit.
+    """
+    deleted = 0
+    while True:
+        ids = [row[0] for row in db.session.query(model.id)
+               .filter(time_column < cutoff, *extra_filters)
+               .order_by(model.id).limit(batch_size).all()]
+        if not ids:
+            break
+        if dry_run:
+            # Count only; step past this batch instead of deleting it
+            extra_filters = list(extra_filters) + [model.id > ids[-1]]
+        else:
+            # Same filter bounded by the batch's id range - exactly these rows, no huge IN list
+            db.session.query(model).filter(time_column < cutoff, *extra_filters,
+                                           model.id.between(ids[0], ids[-1])) \
+                .delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+        if not dry_run:
+            time.sleep(RETENTION_PAUSE_SECS)
+    return deleted
+
+def run_retention(batch_size: int = RETENTION_BATCH, now: Optional[datetime] = None,
+                  dry_run: bool = False) -> Dict:
+    """
+    Apply RETENTION_POLICIES. Returns a report:
+    {'raw': rows, 'minute': rows, 'hour': rows, 'day': rows, 'partitions': [...],
+     'archive': archived readings pruned (included in 'raw'),
+     'bytes': bytes reclaimed (None if unknown), 'dry_run': bool}
+    """
+    now = now or datetime.utcnow()
+    report = {level: 0 for level in RETENTION_POLICIES}
+    report.update(partitions=[], archive=0, bytes=None, dry_run=dry_run)
+    tables = [SensorReading.__tablename__, SensorRollup.__tablename__]
+    postgres = _dialect() == 'postgresql'
+
+    before = _used_bytes(tables)
+    row_bytes = {t: _avg_row_bytes(t) for t in tables} if postgres else {}
+    reusable = 0.0
+
+    # Raw readings: never past the rollup watermark, or un-aggregated history would be lost.
+    # The same window then trims the columnar archive, if it is on.
+    keep = RETENTION_POLICIES['raw']
+    if keep is not None:
+        watermark = db.session.get(RollupWatermark, WATERMARK_NAME)
+        max_id = watermark.last_id if watermark else 0
+        cutoff = now - keep
+        if postgres:
+            dropped = _drop_partitions(cutoff, max_id, dry_run)
+            report['partitions'] = dropped['partitions']
+            report['raw'] += dropped['rows']
+            reusable += dropped['bytes']
+        deleted = _delete_batches(SensorReading, SensorReading.timestamp, cutoff,
+                                  [SensorReading.id <= max_id], batch_size, dry_run)
+        report['raw'] += deleted
+        reusable += deleted * row_bytes.get(SensorReading.__tablename__, 0)
+        if ARCHIVE_ENABLED:
+            report['archive'] = archive.prune(cutoff, dry_run=dry_run)
+            report['raw'] += report['archive']
+
+    for resolution in RESOLUTIONS:
+        keep = RETENTION_POLICIES.get(resolution)
+        if keep is None:
+            continue
+        deleted = _delete_batches(SensorRollup, SensorRollup.bucket, now - keep,
+                                  [SensorRollup.resolution == resolution], batch_size, dry_run)
+        report[resolution] = deleted
+        reusable += deleted * row_bytes.get(SensorRollup.__tablename__, 0)
+
+    if postgres:
+        # Deleted tuples are reused by later inserts once vacuumed; dropped partitions are freed outright
+        report['bytes'] = int(reusable)
+    elif before is not None and not dry_run:
+        report['bytes'] = max(before - _used_bytes(tables), 0)
+
+    total = sum(report[level] for level in RETENTION_POLICIES)
+    if total:
+        logger.info(f"Retention {'(dry run) ' if dry_run else ''}pruned {total} rows "
+                    f"(raw={report['raw']}, " + ", ".join(f"{r}={report[r]}" for r in RESOLUTIONS) +
+                    f"), reclaimed {report['bytes'] if report['bytes'] is not None else '?'} bytes")
+    return report
+
+def vacuum_sqlite() -> Optional[int]:
+    """Shrink the SQLite file after a large prune (locks the DB while it runs). Returns bytes saved."""
+    if _dialect() != 'sqlite':
+        return None
+    path = db.engine.url.database
+    size = os.path.getsize(path) if path and os.path.exists(path) else None
+    db.session.commit()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text("VACUUM"))
+    return size - os.path.getsize(path) if size is not None else None
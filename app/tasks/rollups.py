@@ -0,0 +1,232 @@
+import os
+import threading
+import time
+import fcntl
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import text
+from app.extensions import db
+from models.rollups import RESOLUTIONS, SensorRollup, RollupWatermark, bucket_start
+from models.sensor_data import SensorReading
+from app.tasks.archive import ARCHIVE_ENABLED, run_archive
+from app.tasks.retention import RETENTION_ENABLED, RETENTION_INTERVAL_SECS, describe_policy, run_retention
+from utils.logger import get_logger
+
+logger = get_logger("app")
+
+ROLLUP_INTERVAL_SECS = int(os.getenv('ROLLUP_INTERVAL', '300'))
+ROLLUP_BATCH = int(os.getenv('ROLLUP_BATCH', '5000'))
+ROLLUP_GAP_SECS = int(os.getenv('ROLLUP_GAP_SECS', '600'))  # how long an id gap is held where in-flight transactions can't be seen
+ROLLUP_APPLY_BUCKETS = 1000  # widest bucket range one SELECT of existing rollup rows covers
+WATERMARK_NAME = 'sensor_readings'
+
+# =============================
+# INCREMENTAL ROLLUP
+# =============================
+# Only rows with id above the watermark are read, so each run costs O(new rows)
+# however much history exists. Ids are handed out at INSERT but only become
+# visible at COMMIT, so with more than one writer (the sensor loop plus
+# import_readings.py on Postgres) a lower id can show up after a higher one.
+# The watermark therefore never moves past an id gap until nothing in flight
+# can still fill it: on Postgres, until every transaction that was running
+# when the gap was first seen has ended; on other servers, for ROLLUP_GAP_SECS.
+# SQLite has one writer at a time, so ids commit in order and a gap is just a
+# rolled-back insert. Archive and retention stop at the same watermark, so a
+# row that commits late is never deleted before it is rolled up.
+
+_held_gap = None  # (first missing id, Postgres snapshot xmax or monotonic deadline)
+
+def _gap_settled(gap_id: int) -> bool:
+    """True once no transaction still in flight can commit a row with id `gap_id`"""
+    global _held_gap
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return True
+    if _held_gap is None or _held_gap[0] != gap_id:
+        if dialect == 'postgresql':
+            xmax = db.session.execute(text("SELECT txid_snapshot_xmax(txid_current_snapshot())")).scalar()
+            _held_gap = (gap_id, xmax)
+        else:
+            _held_gap = (gap_id, time.monotonic() + ROLLUP_GAP_SECS)
+    if dialect == 'postgresql':
+        xmin = db.session.execute(text("SELECT txid_snapshot_xmin(txid_current_snapshot())")).scalar()
+        settled = xmin >= _held_gap[1]
+    else:
+        settled = time.monotonic() >= _held_gap[1]
+    if settled:
+        _held_gap = None
+    return settled
+
+def _settled_prefix(rows: List, last_id: int) -> List:
+    """`rows` (ordered by id) up to the first gap an in-flight transaction could still fill"""
+    expected = last_id + 1
+    for i, row in enumerate(rows):
+        if row.id != expected and not _gap_settled(expected):
+            return rows[:i]
+        expected = row.id + 1
+    return rows
+
+def _merge(agg, value, ts):
+    """Fold one reading into [min, max, sum, count, last_value, last_ts]"""
+    if agg[3] == 0:
+        agg[:] = [value, value, value, 1, value, ts]
+        return
+    agg[0] = min(agg[0], value)
+    agg[1] = max(agg[1], value)
+    agg[2] += value
+    agg[3] += 1
+    if agg[5] is None or ts >= agg[5]:
+        agg[4], agg[5] = value, ts
+
+def _bucket_ranges(buckets: List[datetime], width) -> List[List[datetime]]:
+    """Split sorted buckets into [first, last] runs spanning at most ROLLUP_APPLY_BUCKETS buckets"""
+    ranges = []
+    for bucket in buckets:
+        if ranges and bucket - ranges[-1][0] < width * ROLLUP_APPLY_BUCKETS:
+            ranges[-1][1] = bucket
+        else:
+            ranges.append([bucket, bucket])
+    return ranges
+
+def _apply(aggs: Dict[Tuple, list]):
+    """
+    Merge batch aggregates into sensor_rollups - one SELECT per resolution and
+    bucket range, so a backfill batch spread over months never loads every
+    rollup row in between.
+    """
+    for resolution, width in RESOLUTIONS.items():
+        by_bucket: Dict[datetime, list] = {}
+        for key in aggs:
+            if key[0] == resolution:
+                by_bucket.setdefault(key[3], []).append(key)
+        buckets = sorted(by_bucket)
+        for first, last in _bucket_ranges(buckets, width):
+            keys = [key for bucket in buckets if first <= bucket <= last for key in by_bucket[bucket]]
+            _apply_range(resolution, first, last, keys, aggs)
+
+def _apply_range(resolution: str, first: datetime, last: datetime, keys: List[Tuple], aggs: Dict[Tuple, list]):
+    existing = {
+        (r.resolution, r.sensor_type, r.probe_id, r.bucket): r
+        for r in SensorRollup.query.filter(
+            SensorRollup.resolution == resolution,
+            SensorRollup.bucket >= first,
+            SensorRollup.bucket <= last,
+            SensorRollup.sensor_type.in_({k[1] for k in keys}),
+        )
+    }
+
+    for key in keys:
+        mn, mx, total, count, last_value, last_ts = aggs[key]
+        row = existing.get(key)
+        if row is None:
+            db.session.add(SensorRollup(
+                resolution=resolution, sensor_type=key[1], probe_id=key[2], bucket=key[3],
+                min_value=mn, max_value=mx, sum_value=total, count=count,
+                last_value=last_value, last_timestamp=last_ts,
+            ))
+            continue
+        row.min_value = min(row.min_value, mn)
+        row.max_value = max(row.max_value, mx)
+        row.sum_value += total
+        row.count += count
+        if row.last_timestamp is None or last_ts >= row.last_timestamp:
+            row.last_value, row.last_timestamp = last_value, last_ts
+
+def run_rollups(batch_size: int = ROLLUP_BATCH) -> int:
+    """Fold every reading newer than the watermark into the rollups. Returns rows processed."""
+    watermark = db.session.get(RollupWatermark, WATERMARK_NAME)
+    if watermark is None:
+        watermark = RollupWatermark(name=WATERMARK_NAME, last_id=0)
+        db.session.add(watermark)
+        db.session.commit()  # so this session holds no transaction id while gaps are checked
+
+    processed = 0
+    while True:
+        rows = db.session.query(
+            SensorReading.id, SensorReading.timestamp, SensorReading.sensor_type,
+            SensorReading.probe_id, SensorReading.value,
+        ).filter(SensorReading.id > watermark.last_id) \
+         .order_by(SensorReading.id).limit(batch_size).all()
+        settled = _settled_prefix(rows, watermark.last_id)
+        if len(settled) < len(rows):
+            gap_id = (settled[-1].id if settled else watermark.last_id) + 1
+            logger.info(f"Rollups holding at id {gap_id} until in-flight inserts commit")
+        if not settled:
+            break
+
+        aggs: Dict[Tuple, list] = {}
+        for _, ts, sensor_type, probe_id, value in settled:
+            if ts is None or value is None:
+                continue
+            for resolution in RESOLUTIONS:
+                key = (resolution, sensor_type, probe_id, bucket_start(ts, resolution))
+                _merge(aggs.setdefault(key, [None, None, 0.0, 0, None, None]), value, ts)
+
+        _apply(aggs)
+
+        # Rollup rows and watermark commit together - a crash never double-counts
+        watermark.last_id = settled[-1].id
+        watermark.updated_at = datetime.utcnow()
+        db.session.commit()
+        processed += len(settled)
+
+        if len(settled) < batch_size:
+            break
+
+    if processed:
+        logger.info(f"Rollups updated: {processed} readings (watermark id={watermark.last_id})")
+    else:
+        db.session.commit()
+    return processed
+
+# =============================
+# BACKGROUND JOB
+# =============================
+def rollup_loop():
+    logger.info(f"Rollup job started - every {ROLLUP_INTERVAL_SECS}s")
+    logger.info(f"Retention {describe_policy()}")
+    last_retention = None
+    while True:
+        try:
+            run_rollups()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Rollup job error: {e}")
+
+        # Archive + retention run right after a rollup pass, so the watermark they stop at is current
+        if (ARCHIVE_ENABLED or RETENTION_ENABLED) and \
+                (last_retention is None or time.monotonic() - last_retention >= RETENTION_INTERVAL_SECS):
+            last_retention = time.monotonic()
+            try:
+                run_archive()
+                if RETENTION_ENABLED:
+                    run_retention()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Archive/retention error: {e}")
+        time.sleep(ROLLUP_INTERVAL_SECS)
+
+def start_rollup_job(app):
+    """Start the rollup daemon thread in ONE process (same lock pattern as the sensor loop)"""
+    lock_file_path = '/tmp/rollup_job.lock'
+    try:
+        lock_file = open(lock_file_path, 'w')
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except IOError:
+        logger.info("Rollup job already running elsewhere - SKIPPING")
+        return
+
+    def run_in_context():
+        try:
+            with app.app_context():
+                rollup_loop()
+        finally:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                lock_file.close()
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=run_in_context, daemon=True, name="rollup-job")
+    thread.start()
+    logger.info("Rollup background thread started")
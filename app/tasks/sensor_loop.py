@@ -4,192 +4,158 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import threading
 import time
 import fcntl
+from datetime import datetime
+from typing import Dict
 from app.extensions import db
-from sensors import soil_moisture, temperature, light
+from app.tasks.acquisition import acquire_all
 from utils.logger import setup_logging, get_logger
-from utils.notifications import alert_high_temperature, alert_low_light, alert_low_temperature, alert_low_moisture, should_send_alert
+from app.tasks.alert_engine import AlertEngine
+from utils.notifications import cooldowns
+from utils.latest_store import latest_store
+from utils.metrics import metrics
+from utils.ingest import insert_readings, reading_row
+from utils.spool import SPOOL_ENABLED, checkpoint_ready, drain, spool
 from models.sensor_data import SensorReading
-from models.alerts import Alert
 
 # Setup logging FIRST
 setup_logging()
 logger = get_logger("app")
 
-LOW_MOISTURE_THRESHOLD = 30
-HIGH_TEMP_THRESHOLD = 30
-LOW_TEMP_THRESHOLD = 0
-LOW_LIGHT_THRESHOLD = 2000
 INTERVAL_SECS = int(os.getenv('INTERVAL', '60'))
+# Probes that haven't answered by this point in the cycle are logged as missing
+ACQUIRE_DEADLINE_SECS = float(os.getenv('ACQUIRE_DEADLINE', str(INTERVAL_SECS / 2)))
+
+# sensor_type in acquire_all() readings -> SensorReading.sensor_type
+READING_TYPES = {
+    'soil': 'soil_moisture',
+    'temperature': 'temperature',
+    'light': 'light',
+}
+
+# Seconds spent in each step of the most recent run_cycle() - benchmarks and metrics read this
+PHASES = ('acquire', 'spool', 'evaluate', 'persist', 'publish', 'notify')
+PHASE_TIMINGS: Dict[str, float] = {}
+
+def run_cycle(engine: AlertEngine) -> int:
+    """One acquire -> alerts -> persist pass. Returns the number of readings saved."""
+    PHASE_TIMINGS.clear()
+    mark = time.perf_counter()
+
+    def phase_done(phase):
+        nonlocal mark
+        now = time.perf_counter()
+        PHASE_TIMINGS[phase] = now - mark
+        mark = now
+
+    # STEP 1: READ ALL SENSORS FIRST (concurrently - one worker per bus, memory only)
+    readings = acquire_all(ACQUIRE_DEADLINE_SECS)
+    phase_done('acquire')
+    # One timestamp for the whole cycle, so every probe's series lines up point for point
+    cycle_time = datetime.utcnow().replace(microsecond=0)
+
+    # STEP 2: log ALL sensor readings (ALWAYS - complete history)
+    rows = []
+    latest = {}
+    for sensor_type, probe_values in readings.items():
+        reading_type = READING_TYPES[sensor_type]
+        latest[reading_type] = {}
+        for probe_name, value in probe_values.items():
+            if value is not None:
+                rows.append(reading_row(reading_type, probe_name, value, timestamp=cycle_time))
+                latest[reading_type][probe_name] = value
+
+    # Spool to local disk before anything touches the DB - if it is down, these replay on a later cycle
+    use_spool = SPOOL_ENABLED and checkpoint_ready(db.session)
+    spooled = False
+    if use_spool and rows:
+        try:
+            spool.append(rows)
+            spooled = True
+        except OSError as e:
+            logger.error(f"Reading spool append failed - writing straight to the DB: {e}")
+    phase_done('spool')
+
+    # STEP 3: EVALUATE ALERTS IN MEMORY (stages new/resolved alerts, no commit yet)
+    # May need the DB (reload after a failed cycle); a failure here skips alerts, not readings
+    try:
+        notifications = engine.evaluate(readings)
+    except Exception as e:
+        db.session.rollback()
+        engine.reset()
+        engine.changes = []
+        notifications = []
+        logger.error(f"Alert evaluation failed - skipping alerts this cycle: {e}")
+    phase_done('evaluate')
+
+    # STEP 4: SINGLE COMMIT for alerts, their last_notified stamps AND readings (readings as one bulk INSERT, no ORM objects)
+    engine.flush()
+    due = engine.stage_notifications(notifications)
+    if use_spool:
+        # This cycle plus any backlog left by an outage, with the spool checkpoint in the same commit
+        reading_count, last_n = drain(db.session, spool)
+        if reading_count > len(rows):
+            logger.info(f"Replayed {reading_count - len(rows)} spooled readings from earlier cycles")
+    if not spooled:
+        reading_count = insert_readings(db.session, rows)
+    reading_id = db.session.query(db.func.max(SensorReading.id)).scalar() if reading_count else None
+    db.session.commit()
+    if use_spool:
+        spool.discard(last_n)
+    phase_done('persist')
+
+    # STEP 5: publish to the shared latest-value store (dashboard reads this, not the DB)
+    if reading_id is None:
+        reading_id = (latest_store.read() or {}).get('reading_id')  # nothing saved - keep last id
+    latest_store.publish(latest, reading_id=reading_id,
+                         reading_time=cycle_time.strftime("%Y-%m-%d %H:%M:%S"),
+                         alert_id=engine.last_alert_id,
+                         alert_time=engine.last_alert_time.strftime("%Y-%m-%d %H:%M:%S") if engine.last_alert_time else None,
+                         alert_changes=engine.changes)
+    phase_done('publish')
+
+    # STEP 6: notify only once the alert rows and stamps are committed
+    engine.notify(due)
+    phase_done('notify')
+    return reading_count
 
 def sensor_loop():
     """Single clean sensor loop - FIXED: 1 reading/probe/60s instead of 272/hour"""
     logger.info("Sensor logging loop started - OPTIMIZED for 60s intervals")
+    engine = AlertEngine()
+
+    # Load alert state and notification cooldowns once - cycles then run from memory
+    try:
+        engine.load()
+        cooldowns.load()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Alert state preload failed (retrying next cycle): {e}")
     
     while True:
         try:
-            # STEP 1: READ ALL SENSORS FIRST (fast, memory only)
-            soil_readings = soil_moisture.read_all()
-            temp_readings = temperature.read_all()
-            light_readings = light.read_all()
-
-            # STEP 2: PROCESS ALL ALERTS FIRST (track changes, no readings yet)
-            alerts_changed = False  # Track if we need to commit alerts
-            
-            # ===== SOIL MOISTURE ALERTS =====
-            for probe_name, soil_val in soil_readings.items():
-                # Skip if sensor failed to read (None = hardware/sensor error)
-                if soil_val is None:
-                    continue
-                
-                sensor_name = f"Soil-{probe_name.title()}"
-                
-                # Check if there's already an ACTIVE alert for this specific sensor
-                existing_alert = Alert.query.filter_by(sensor_name=sensor_name, alert_type='Low Moisture', status='active').first()
-                
-                # THRESHOLD BREACH: soil_val <= LOW_MOISTURE_THRESHOLD
-                if soil_val <= LOW_MOISTURE_THRESHOLD:
-                    # FIRST TIME BREACH: No existing active alert found
-                    if not existing_alert:
-                        # Create new active alert record (this triggers first notification)
-                        db.session.add(Alert(alert_type='Low Moisture', sensor_name=sensor_name, value=soil_val))
-                        db.session.commit()
-                        alert_low_moisture(sensor_name, soil_val)  # Send first notification immediately
-                    else:
-                        # ONGOING BREACH: Alert already exists, check 4hr notification cooldown
-                        # should_send_alert() checks last_notified timestamp in Alert table
-                        if should_send_alert(sensor_name, 'low_moisture'):
-                            # 4+ hours passed → Send email notification
-                            alert_low_moisture(sensor_name, soil_val)
-
-                # CONDITION RESOLVED: Reading now normal AND alert was active
-                elif existing_alert and soil_val > LOW_MOISTURE_THRESHOLD:
-                    # Problem fixed → Mark alert as resolved (stops future notifications)
-                    existing_alert.status = 'resolved'
-                    db.session.commit()
-
-            # ===== TEMPERATURE ALERTS =====
-            for probe_name, temp_val in temp_readings.items():
-                # Skip if sensor failed to read (None = hardware/sensor error)
-                if temp_val is None:
-                    continue
-                
-                sensor_name = f"Temp-{probe_name.title()}"
-                
-                # Check existing alerts
-                high_alert = Alert.query.filter_by(sensor_name=sensor_name, alert_type='High Temperature', status='active').first()
-                low_alert = Alert.query.filter_by(sensor_name=sensor_name, alert_type='Low Temperature', status='active').first()
-                
-                # THRESHOLD BREACH: temp_val >= HIGH_TEMP_THRESHOLD (e.g., <= 50 lux)
-                if temp_val >= HIGH_TEMP_THRESHOLD:
-                    # FIRST TIME BREACH: No existing active alert found
-                    if not high_alert:
-                        # Create new active alert record (this triggers first notification via should_send_alert)
-                        db.session.add(Alert(alert_type='High Temperature', sensor_name=sensor_name, value=temp_val))
-                        db.session.commit()
-                        alert_high_temperature(sensor_name, temp_val)  #Send first notification immediedatley 
-                    else:
-                        # ONGOING BREACH: Alert already exists, check 4hr notification cooldown
-                        # should_send_alert() checks last_notified timestamp in Alert table
-                        if should_send_alert(sensor_name, 'high_temp'):
-                            # 4+ hours passed → Send email notification
-                            alert_high_temperature(sensor_name, temp_val)
-
-                # CONDITION RESOLVED: Reading now normal AND alert was active
-                elif high_alert and temp_val < HIGH_TEMP_THRESHOLD:
-                    # Problem fixed → Mark alert as resolved (stops future notifications)
-                    high_alert.status = 'resolved'
-                    db.session.commit()
-                
-                # THRESHOLD BREACH: temp_val >= HIGH_TEMP_THRESHOLD (e.g., <= 50 lux)
-                if temp_val <= LOW_TEMP_THRESHOLD:
-                    # FIRST TIME BREACH: No existing active alert found
-                    if not low_alert:
-                        # Create new active alert record (this triggers first notification via should_send_alert)
-                        db.session.add(Alert(alert_type='Low Temperature', sensor_name=sensor_name, value=temp_val))
-                        db.session.commit()
-                        alert_low_temperature(sensor_name, temp_val) #Send first notification immediedatley 
-                    else:
-                        # ONGOING BREACH: Alert already exists, check 4hr notification cooldown
-                        # should_send_alert() checks last_notified timestamp in Alert table
-                        if should_send_alert(sensor_name, 'low_temp'):
-                            # 4+ hours passed → Send email notification
-                            alert_low_temperature(sensor_name, temp_val)
-                
-                # CONDITION RESOLVED: Reading now normal AND alert was active
-                elif low_alert and temp_val > LOW_TEMP_THRESHOLD:
-                    # Problem fixed → Mark alert as resolved (stops future notifications)
-                    low_alert.status = 'resolved'
-                    db.session.commit()
-
-            # ===== LIGHT ALERTS =====
-            for probe_name, light_val in light_readings.items():
-                # Skip if sensor failed to read (None = hardware/sensor error)
-                if light_val is None:
-                    continue
-
-                # Create consistent sensor name: "Light-Probe1", "Light-Probe2", etc.
-                sensor_name = f"Light-{probe_name.title()}"
-
-                # Check if there's already an ACTIVE alert for this specific sensor/light condition
-                existing_alert = Alert.query.filter_by(sensor_name=sensor_name, alert_type='Low Light', status='active').first()
-                
-                # THRESHOLD BREACH: light_val <= LOW_LIGHT_THRESHOLD
-                if light_val <= LOW_LIGHT_THRESHOLD:
-                    # FIRST TIME BREACH: No existing active alert found
-                    if not existing_alert:
-                        # Create new active alert record (this triggers first notification)
-                        db.session.add(Alert(alert_type='Low Light', sensor_name=sensor_name, value=light_val))
-                        db.session.commit()
-                        alert_low_light(sensor_name, light_val)  # Send first notification immediately 
-                    else: 
-                        # ONGOING BREACH: Alert already exists, check 4hr notification cooldown
-                        if should_send_alert(sensor_name, 'low_light'):
-                            # 4+ hours passed → Send email notification
-                            alert_low_light(sensor_name, light_val)
-
-                # CONDITION RESOLVED: Reading now normal AND alert was active
-                elif existing_alert and light_val >= LOW_LIGHT_THRESHOLD:
-                    # Problem fixed → Mark alert as resolved (stops future notifications)
-                    existing_alert.status = 'resolved'
-                    db.session.commit()
-            
-
-            # ========================================
-            # STEP 3: NOW log ALL sensor readings (batch, memory only)
-            # ========================================
-            reading_count = 0
-            
-            # SOIL readings (ALWAYS log every reading to SensorReading table - complete history)
-            for probe_name, soil_val in soil_readings.items():
-                if soil_val is not None:
-                    db.session.add(SensorReading(sensor_type='soil_moisture', value=soil_val, probe_id=probe_name))
-                    reading_count += 1
-            
-            # TEMPERATURE readings (ALWAYS log every reading to SensorReading table - complete history)
-            for probe_name, temp_val in temp_readings.items():
-                if temp_val is not None:
-                    db.session.add(SensorReading(sensor_type='temperature', value=temp_val, probe_id=probe_name))
-                    reading_count += 1
-            
-            # LIGHT readings (ALWAYS log every reading to SensorReading table - complete history)
-            for probe_name, light_val in light_readings.items():
-                if light_val is not None:
-                    db.session.add(SensorReading(sensor_type='light', value=light_val, probe_id=probe_name))
-                    reading_count += 1
-            
-            # ========================================
-            # STEP 4: SINGLE COMMIT for ALL readings (fast!)
-            # ========================================
-            db.session.commit()
-            logger.info(f"Sensor cycle complete: {reading_count} readings saved every {INTERVAL_SECS}s")
+            started, queries = time.perf_counter(), metrics.thread_queries()
+            reading_count = run_cycle(engine)
+            split = ", ".join(f"{phase} {secs * 1000:.0f}ms" for phase, secs in PHASE_TIMINGS.items())
+            logger.info(f"Sensor cycle complete: {reading_count} readings saved every {INTERVAL_SECS}s ({split})")
+
+            metrics.inc('sensor_cycles_total')
+            metrics.observe('sensor_cycle_seconds', time.perf_counter() - started)
+            for phase, secs in PHASE_TIMINGS.items():
+                metrics.observe('sensor_cycle_phase_seconds', secs, phase=phase)
+            metrics.set('sensor_cycle_readings', reading_count)
+            metrics.set('sensor_cycle_queries', metrics.thread_queries() - queries)
+            metrics.set('sensor_last_cycle_timestamp_seconds', time.time())
 
         except Exception as e:
-            # Rollback on any error
+            # Rollback on any error - alert state reloads from DB next cycle
             db.session.rollback()
+            engine.reset()
             logger.error(f"Sensor loop error: {e}")
+            metrics.inc('sensor_cycle_errors_total')
+        metrics.flush()
         
         # ========================================
-        # STEP 6: SLEEP - NOW TRULY 60s intervals (fixes 272→60 readings/hour)
+        # STEP 7: SLEEP - NOW TRULY 60s intervals (fixes 272→60 readings/hour)
         # ========================================
         logger.debug(f"Sleeping {INTERVAL_SECS}s until next cycle...")
         time.sleep(INTERVAL_SECS)
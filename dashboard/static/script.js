@@ -1,33 +1,46 @@
-let soilChart, tempChart, lightChart;
+// One chart per sensor type, one dataset per active probe (from the Probe table)
+const CHARTS = {
+    soil_moisture: { id: 'soilChart', title: 'Soil Moisture', labelsKey: 'soil_labels', maxY: 100 },
+    temperature: { id: 'tempChart', title: 'Temperature', labelsKey: 'temp_labels', maxY: 50 },
+    light: { id: 'lightChart', title: 'Light', labelsKey: 'light_labels', maxY: 30000 },
+};
+const PALETTE = ['green', 'red', 'orange', 'blue', 'purple', 'brown', 'teal', 'magenta'];
+const charts = {};
+
+function probeDatasets(series) {
+    return series.map((probe, i) => ({
+        label: probe.probe,
+        data: probe.values,
+        borderColor: PALETTE[i % PALETTE.length],
+        fill: false,
+        spanGaps: true,
+    }));
+}
 
 // Update sensor charts
 async function updateCharts() {
     try {
-        const res = await fetch('/api/readings');
+        const res = await fetch('/api/readings/probes');
         const data = await res.json();
 
-        function initChart(id, label, color, values, labels, maxY) {
-            const ctx = document.getElementById(id).getContext('2d');
-            return new Chart(ctx, {
-                type: 'line',
-                data: { labels: labels, datasets: [{ label: label, data: values, borderColor: color, fill: false }] },
-                options: { scales: { y: { min: 0, max: maxY } } }
-            });
-        }
-
-        if (!soilChart) {
-            soilChart = initChart('soilChart', 'Soil Moisture', 'green', data.soil_moisture, data.soil_labels, 100);
-            tempChart = initChart('tempChart', 'Temperature', 'red', data.temperature, data.temp_labels, 50);
-            lightChart = initChart('lightChart', 'Light', 'orange', data.light, data.light_labels, 30000);
-        } else {
-            function updateChart(chart, values, labels) {
-                chart.data.labels = labels;
-                chart.data.datasets[0].data = values;
-                chart.update();
+        for (const [type, cfg] of Object.entries(CHARTS)) {
+            const labels = data[cfg.labelsKey];
+            const datasets = probeDatasets(data.series[type] || []);
+            if (!charts[type]) {
+                const ctx = document.getElementById(cfg.id).getContext('2d');
+                charts[type] = new Chart(ctx, {
+                    type: 'line',
+                    data: { labels: labels, datasets: datasets },
+                    options: {
+                        scales: { y: { min: 0, max: cfg.maxY } },
+                        plugins: { title: { display: true, text: cfg.title } }
+                    }
+                });
+            } else {
+                charts[type].data.labels = labels;
+                charts[type].data.datasets = datasets;
+                charts[type].update();
             }
-            updateChart(soilChart, data.soil_moisture, data.soil_labels);
-            updateChart(tempChart, data.temperature, data.temp_labels);
-            updateChart(lightChart, data.light, data.light_labels);
         }
 
         // Update sensor status indicators
@@ -83,14 +96,85 @@ function updateSensorStatus(data) {
 
 }
 
-// Run updates every 5 seconds
-setInterval(() => {
-    updateCharts();
-    updateAlerts();
-}, 5000);
+// ----- Live updates: SSE stream, polling as fallback -----
+const CHART_POINTS = 20;
+let pollTimer = null;
+let lastFrame = null;
+
+function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(() => {
+        updateCharts();
+        updateAlerts();
+    }, 5000);
+}
+
+// Append only this cycle's point for each probe, keeping the last CHART_POINTS.
+// Returns false if the frame has a probe the chart doesn't know (caller resyncs).
+function appendPoints(chart, label, probeValues) {
+    const known = new Set(chart.data.datasets.map(ds => ds.label));
+    if (Object.keys(probeValues).some(name => !known.has(name))) return false;
+
+    chart.data.labels.push(label);
+    chart.data.datasets.forEach(ds => ds.data.push(probeValues[ds.label] ?? null));
+    const extra = chart.data.labels.length - CHART_POINTS;
+    if (extra > 0) {
+        chart.data.labels.splice(0, extra);
+        chart.data.datasets.forEach(ds => ds.data.splice(0, extra));
+    }
+    chart.update();
+    return true;
+}
+
+function applyFrame(frame) {
+    // Missed a cycle (or collector restarted)? Resync the whole window once.
+    const gap = !lastFrame || frame.pid !== lastFrame.pid || frame.seq !== lastFrame.seq + 1;
+    lastFrame = frame;
+    if (gap || Object.keys(charts).length === 0) {
+        updateCharts();
+        return;
+    }
+    for (const type of Object.keys(CHARTS)) {
+        if (!appendPoints(charts[type], frame.time, frame.probes[type] || {})) {
+            updateCharts();  // a probe was added - rebuild datasets from the Probe table
+            return;
+        }
+    }
+    updateSensorStatus(frame);
+}
+
+function startStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    const source = new EventSource('/api/stream');
+    let failures = 0;
+
+    source.addEventListener('readings', e => {
+        failures = 0;
+        const frame = JSON.parse(e.data);
+        // First frame after (re)connecting: just remember where we are
+        if (!lastFrame) {
+            lastFrame = { pid: frame.pid, seq: frame.seq - 1 };
+        }
+        applyFrame(frame);
+    });
+    source.addEventListener('alerts', () => updateAlerts());
+    source.onopen = () => { failures = 0; };
+    source.onerror = () => {
+        // EventSource retries by itself; give up and poll if the stream keeps failing
+        failures += 1;
+        if (source.readyState === EventSource.CLOSED || failures >= 3) {
+            source.close();
+            startPolling();
+        }
+    };
+}
 
 // Initial load
 window.onload = () => {
     updateCharts();
     updateAlerts();
+    startStream();
 };
\ No newline at end of file
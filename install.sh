@@ -34,7 +34,7 @@ rm -rf venv
 python3 -m venv venv
 source venv/bin/activate
 pip install --upgrade pip setuptools wheel gunicorn
-pip install RPi.GPIO==0.7.1 smbus2==0.4.1 adafruit-circuitpython-ads1x15 adafruit_ads1x15 adafruit-circuitpython-bh1750 flask==2.3.2 flask-wtf==1.2.1 flask-limiter==3.5.0 gunicorn flask-sqlalchemy==3.0.5 psycopg2-binary requests==2.32.0 paho-mqtt==1.6.1 python-dotenv==1.0.0 psutil
+pip install RPi.GPIO==0.7.1 smbus2==0.4.1 adafruit-circuitpython-ads1x15 adafruit_ads1x15 adafruit-circuitpython-bh1750 flask==2.3.2 flask-wtf==1.2.1 flask-limiter==3.5.0 gunicorn flask-sqlalchemy==3.0.5 psycopg2-binary requests==2.32.0 paho-mqtt==1.6.1 python-dotenv==1.0.0 psutil numpy
 
 # Production .env
 cat > .env << EOF
@@ -3,6 +3,11 @@ from app.extensions import db
 
 class Alert(db.Model):
     __tablename__ = 'alerts'
+    __table_args__ = (
+        # Active-alert lookups by sensor + type + status, and /alerts newest-first
+        db.Index('ix_alerts_sensor_type_status', 'sensor_name', 'alert_type', 'status'),
+        db.Index('ix_alerts_timestamp', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
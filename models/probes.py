@@ -1,6 +1,14 @@
 from datetime import datetime
 from app.extensions import db
 
+# Probe.sensor_type -> SensorReading.sensor_type
+PROBE_READING_TYPES = {
+    'soil': 'soil_moisture',
+    'temperature': 'temperature',
+    'temp': 'temperature',
+    'light': 'light',
+}
+
 class Probe(db.Model):
     __tablename__ = 'probes'
     
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from app.extensions import db
+
+# Bucket widths, finest first. Raw sensor_readings are one row per probe per minute.
+RESOLUTIONS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+def bucket_start(ts, resolution):
+    """Truncate a timestamp to the start of its rollup bucket"""
+    if resolution == 'minute':
+        return ts.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if resolution == 'day':
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown rollup resolution: {resolution}")
+
+class SensorRollup(db.Model):
+    """Per-probe min/max/mean/count/last over a minute, hour or day bucket"""
+    __tablename__ = 'sensor_rollups'
+    __table_args__ = (
+        # Also serves range reads: resolution + probe, ordered by bucket
+        db.UniqueConstraint('resolution', 'sensor_type', 'probe_id', 'bucket', name='uq_sensor_rollups_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.String(10), nullable=False)   # 'minute', 'hour', 'day'
+    bucket = db.Column(db.DateTime, nullable=False)          # bucket start (UTC)
+    sensor_type = db.Column(db.String(50), nullable=False)
+    probe_id = db.Column(db.String(20), nullable=True)
+
+    min_value = db.Column(db.Float)
+    max_value = db.Column(db.Float)
+    sum_value = db.Column(db.Float)                          # kept so mean merges incrementally
+    count = db.Column(db.Integer, default=0)
+    last_value = db.Column(db.Float)
+    last_timestamp = db.Column(db.DateTime)
+
+    @property
+    def mean(self):
+        return self.sum_value / self.count if self.count else None
+
+    @classmethod
+    def series(cls, resolution, sensor_type, probe_id, start, end):
+        """Rollup rows for one probe with bucket in [start, end), oldest first"""
+        query = cls.query.filter(
+            cls.resolution == resolution,
+            cls.sensor_type == sensor_type,
+            cls.bucket >= start,
+            cls.bucket < end,
+        )
+        query = query.filter(cls.probe_id == probe_id) if probe_id is not None else query.filter(cls.probe_id.is_(None))
+        return query.order_by(cls.bucket).all()
+
+    def __repr__(self):
+        return f"<SensorRollup {self.resolution} {self.sensor_type}/{self.probe_id} {self.bucket} n={self.count}>"
+
+def pick_resolution(start, end, points):
+    """
+    Coarsest rollup that still gives at least `points` buckets over [start, end),
+    or None when even minute buckets would be too few (read raw rows instead).
+    """
+    span = end - start
+    best = None
+    for resolution, width in RESOLUTIONS.items():
+        if span / width >= points:
+            best = resolution
+    return best
+
+class RollupWatermark(db.Model):
+    """Highest sensor_readings.id already folded into the rollups"""
+    __tablename__ = 'rollup_watermarks'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
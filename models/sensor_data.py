@@ -1,8 +1,22 @@
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 from app.extensions import db
 
+# How far back latest_window() looks first; types with nothing newer fall back to an unbounded query
+LATEST_LOOKBACK = timedelta(hours=float(os.getenv('LATEST_LOOKBACK_HOURS', '24')))
+
+# Unbounded fallback rows per (sensor_type, n, by_probe). A type stays here only while
+# it has nothing inside the lookback - any new reading brings it back into the window
+# query, which drops the entry - so the full-history scan runs once, not every cycle.
+_stale_windows = {}
+
 class SensorReading(db.Model):
     __tablename__ = 'sensor_readings'
+    __table_args__ = (
+        # Dashboard/API: latest N per type, and per type+probe, ordered by time
+        db.Index('ix_sensor_readings_type_ts', 'sensor_type', 'timestamp'),
+        db.Index('ix_sensor_readings_type_probe_ts', 'sensor_type', 'probe_id', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
@@ -11,5 +25,46 @@ class SensorReading(db.Model):
     device_id = db.Column(db.String(50), nullable=True) 
     probe_id = db.Column(db.String(20), nullable=True)
 
+    @classmethod
+    def latest_window(cls, n, sensor_types, by_probe=False, lookback=LATEST_LOOKBACK):
+        """
+        Last n readings per sensor type (or per type+probe) in ONE query via
+        ROW_NUMBER() OVER (PARTITION BY ...). The lookback bound keeps the window
+        function on an index range scan instead of the whole table; types with no
+        reading inside it (collector down, probe unplugged) are re-queried without
+        the bound once and remembered, so they still show their last known values.
+        Returns rows of (sensor_type, probe_id, value, timestamp), oldest first per group.
+        """
+        rows = cls._window(n, sensor_types, by_probe, datetime.utcnow() - lookback)
+        present = {row[0] for row in rows}
+        for sensor_type in present:
+            _stale_windows.pop((sensor_type, n, by_probe), None)
+        missing = [t for t in sensor_types if t not in present]
+        if missing:
+            unknown = [t for t in missing if (t, n, by_probe) not in _stale_windows]
+            if unknown:
+                fallback = cls._window(n, unknown, by_probe, None)
+                for sensor_type in unknown:
+                    _stale_windows[(sensor_type, n, by_probe)] = [row for row in fallback if row[0] == sensor_type]
+            for sensor_type in missing:
+                rows += _stale_windows[(sensor_type, n, by_probe)]
+            rows.sort(key=lambda row: (row[0], row[1] or '', row[3]) if by_probe else (row[0], row[3]))
+        return rows
+
+    @classmethod
+    def _window(cls, n, sensor_types, by_probe, since):
+        partition = [cls.sensor_type, cls.probe_id] if by_probe else [cls.sensor_type]
+        rn = db.func.row_number().over(partition_by=partition, order_by=cls.timestamp.desc()).label('rn')
+        recent = db.session.query(cls.sensor_type, cls.probe_id, cls.value, cls.timestamp, rn) \
+            .filter(cls.sensor_type.in_(sensor_types))
+        if since is not None:
+            recent = recent.filter(cls.timestamp >= since)
+        recent = recent.subquery()
+        order = [recent.c.sensor_type, recent.c.probe_id] if by_probe else [recent.c.sensor_type]
+        return db.session.query(recent.c.sensor_type, recent.c.probe_id, recent.c.value, recent.c.timestamp) \
+            .filter(recent.c.rn <= n) \
+            .order_by(*order, recent.c.timestamp) \
+            .all()
+
     def __repr__(self):
         return f"<SensorReading {self.sensor_type}={self.value} at {self.timestamp}>"
@@ -0,0 +1,10 @@
+from datetime import datetime
+from app.extensions import db
+
+class SpoolCheckpoint(db.Model):
+    """Highest reading-spool record number already inserted, per spool directory (epoch)"""
+    __tablename__ = 'reading_spool_checkpoints'
+
+    epoch = db.Column(db.String(32), primary_key=True)   # random id written when the spool dir is created
+    last_n = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
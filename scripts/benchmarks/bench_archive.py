@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Storage and range-scan benchmark: sensor_readings (SQLite, with the composite
+indexes) against the columnar archive (utils/archive.py) for the same readings.
+
+    python scripts/benchmarks/bench_archive.py --months 12 --probes 3
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, text
+
+from models.sensor_data import SensorReading
+from utils.archive import ColumnarArchive
+
+
+def seed(engine, archive, months, probes, batch=50000):
+    """One reading per probe per minute, written to both stores"""
+    start = datetime(2024, 1, 1)
+    minutes = months * 30 * 24 * 60
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        for p in range(probes):
+            probe = f"probe{p}"
+            buffer, points = [], []
+            for i in range(minutes):
+                ts = start + timedelta(minutes=i)
+                value = round(rng.uniform(0, 100), 2)
+                buffer.append({'timestamp': ts, 'sensor_type': 'soil_moisture', 'probe_id': probe, 'value': value})
+                points.append((ts, value))
+                if len(buffer) >= batch:
+                    conn.execute(insert(SensorReading.__table__), buffer)
+                    buffer = []
+            if buffer:
+                conn.execute(insert(SensorReading.__table__), buffer)
+            archive.append('soil_moisture', probe, points)
+    return start, start + timedelta(minutes=minutes)
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--probes', type=int, default=3)
+    parser.add_argument('--span-days', type=int, default=30, help="Range scanned per query")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_archive_')
+    db_path = os.path.join(workdir, 'readings.db')
+    engine = create_engine(f"sqlite:///{db_path}")
+    SensorReading.__table__.create(engine)
+    archive = ColumnarArchive(os.path.join(workdir, 'archive'))
+
+    print(f"Seeding {args.months} months x {args.probes} probes of 1/min readings...")
+    started = time.time()
+    first, last = seed(engine, archive, args.months, args.probes)
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text("VACUUM"))
+        rows = conn.execute(text("SELECT COUNT(*) FROM sensor_readings")).scalar()
+    print(f"Seeded {rows:,} readings in {time.time() - started:.1f}s\n")
+
+    db_bytes = os.path.getsize(db_path)
+    archive_bytes = archive.size_bytes()
+    print(f"{'store':<10} | {'bytes':>12} | {'bytes/row':>9}")
+    print(f"{'-' * 10}-+-{'-' * 12}-+-{'-' * 9}")
+    print(f"{'sqlite':<10} | {db_bytes:>12,} | {db_bytes / rows:>9.1f}")
+    print(f"{'archive':<10} | {archive_bytes:>12,} | {archive_bytes / rows:>9.1f}")
+    print(f"shrink: {db_bytes / archive_bytes:.1f}x\n")
+
+    start = first + (last - first) / 2
+    end = start + timedelta(days=args.span_days)
+    sql = text("SELECT timestamp, value FROM sensor_readings WHERE sensor_type = 'soil_moisture' "
+               "AND probe_id = 'probe0' AND timestamp >= :s AND timestamp < :e ORDER BY timestamp")
+    with engine.connect() as conn:
+        db_ms, db_rows = timed(lambda: conn.execute(sql, {'s': start, 'e': end}).fetchall(), args.repeat)
+    archive_ms, archive_rows = timed(lambda: archive.read('soil_moisture', 'probe0', start, end), args.repeat)
+    print(f"{args.span_days}-day range scan, one probe:")
+    print(f"  sqlite:  {db_ms:8.2f} ms ({len(db_rows):,} rows)")
+    print(f"  archive: {archive_ms:8.2f} ms ({len(archive_rows[0]):,} rows)  {db_ms / archive_ms:.0f}x faster")
+
+    engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Concurrent read/write benchmark for the SQLite profile (app/extensions/sqlite.py).
+One writer commits sensor-cycle batches while reader processes (like gunicorn
+workers) run the dashboard's latest-readings query; run once with SQLite defaults (rollback
+journal) and once with the tuned profile (WAL + pragmas), and compare reader
+latency and "database is locked" errors.
+
+    python scripts/benchmarks/bench_sqlite_concurrency.py --readers 6 --seconds 10
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import argparse
+import multiprocessing
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import OperationalError
+
+from app.extensions.sqlite import configure_sqlite, sqlite_engine_options
+from models.sensor_data import SensorReading
+
+READ_SQL = text("SELECT value, timestamp FROM sensor_readings WHERE sensor_type = :t "
+                "ORDER BY timestamp DESC LIMIT 20")
+
+
+def make_engine(path, tuned):
+    url = f"sqlite:///{path}"
+    if tuned:
+        engine = create_engine(url, **sqlite_engine_options())
+        configure_sqlite(engine)
+    else:
+        # SQLite defaults: rollback journal, synchronous=FULL; short timeout so lock waits show up as errors
+        engine = create_engine(url, connect_args={'check_same_thread': False, 'timeout': 1})
+    return engine
+
+
+def reader(path, tuned, seconds, queue):
+    """One reader process: latest-readings query in a loop, returns latencies (ms) and lock errors"""
+    engine = make_engine(path, tuned)
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(READ_SQL, {'t': 'soil_moisture'}).fetchall()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except OperationalError:
+            errors += 1
+    engine.dispose()
+    queue.put((latencies, errors))
+
+
+def run(path, tuned, args):
+    engine = make_engine(path, tuned)
+    with engine.begin() as conn:
+        conn.execute(text(f"PRAGMA journal_mode={'WAL' if tuned else 'DELETE'}"))
+
+    queue = multiprocessing.Queue()
+    readers = [multiprocessing.Process(target=reader, args=(path, tuned, args.seconds, queue))
+               for _ in range(args.readers)]
+    for p in readers:
+        p.start()
+
+    # Writer: the sensor loop committing one batch after another
+    rng = random.Random(1)
+    commits, write_errors = 0, 0
+    ts = datetime.utcnow()
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        ts += timedelta(minutes=1)
+        rows = [{'timestamp': ts, 'sensor_type': 'soil_moisture', 'probe_id': f"probe{p}",
+                 'value': rng.uniform(0, 100)} for p in range(args.batch)]
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(SensorReading.__table__), rows)
+            commits += 1
+        except OperationalError:
+            write_errors += 1
+
+    latencies, errors = [], write_errors
+    for _ in readers:
+        part, part_errors = queue.get()
+        latencies.extend(part)
+        errors += part_errors
+    for p in readers:
+        p.join()
+    engine.dispose()
+
+    latencies.sort()
+    return {
+        'reads': len(latencies),
+        'p50': statistics.median(latencies) if latencies else 0,
+        'p99': latencies[int(len(latencies) * 0.99) - 1] if latencies else 0,
+        'max': latencies[-1] if latencies else 0,
+        'errors': errors,
+        'commits': commits,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--batch', type=int, default=500, help="rows per writer commit")
+    parser.add_argument('--seed-rows', type=int, default=200_000)
+    parser.add_argument('--dir', help="Where to put the test databases (use the real disk / SD card, not tmpfs)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_sqlite_', dir=args.dir)
+    print(f"{'profile':<10} | {'reads':>8} | {'p50 ms':>7} | {'p99 ms':>7} | {'max ms':>8} | {'locked':>6} | {'commits':>7}")
+    print(f"{'-' * 10}-+-{'-' * 8}-+-{'-' * 7}-+-{'-' * 7}-+-{'-' * 8}-+-{'-' * 6}-+-{'-' * 7}")
+    for name, tuned in (('default', False), ('tuned', True)):
+        path = os.path.join(workdir, f"{name}.db")
+        seed = create_engine(f"sqlite:///{path}")
+        SensorReading.__table__.create(seed)
+        start = datetime.utcnow() - timedelta(minutes=args.seed_rows)
+        with seed.begin() as conn:
+            conn.execute(insert(SensorReading.__table__), [
+                {'timestamp': start + timedelta(minutes=i), 'sensor_type': 'soil_moisture',
+                 'probe_id': f"probe{i % 10}", 'value': float(i % 100)} for i in range(args.seed_rows)])
+        seed.dispose()
+
+        r = run(path, tuned, args)
+        print(f"{name:<10} | {r['reads']:>8,} | {r['p50']:>7.2f} | {r['p99']:>7.2f} | {r['max']:>8.2f} | "
+              f"{r['errors']:>6} | {r['commits']:>7,}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
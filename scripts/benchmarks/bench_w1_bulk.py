@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark DS18B20 cycle time: per-device conversion vs therm_bulk_read bulk mode.
+Runs against a fake sysfs tree (sensors/fake_w1.py) - no hardware needed.
+
+    python scripts/benchmarks/bench_w1_bulk.py --counts 1 5 10 20 40 --conversion 0.05
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import argparse
+import tempfile
+import time
+
+from sensors import temperature
+from sensors.fake_w1 import FakeW1Bus
+
+
+def run_cycle(probe_names, bulk):
+    temperature.BULK_READ = bulk
+    start = time.perf_counter()
+    results = temperature.read_all(probe_names)
+    elapsed = time.perf_counter() - start
+    assert all(v is not None for v in results.values()), results
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--counts', type=int, nargs='+', default=[1, 5, 10, 20, 40])
+    parser.add_argument('--conversion', type=float, default=0.05,
+                        help="Conversion wait in seconds (real DS18B20: 0.8)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    temperature.CONVERSION_SECS = args.conversion
+
+    print(f"Conversion wait: {args.conversion}s  (best of {args.repeat})")
+    print(f"{'probes':>7} | {'per-device (s)':>14} | {'bulk (s)':>9} | {'speedup':>7}")
+    print(f"{'-' * 7}-+-{'-' * 14}-+-{'-' * 9}-+-{'-' * 7}")
+
+    for count in args.counts:
+        with tempfile.TemporaryDirectory() as root:
+            bus = FakeW1Bus(root)
+            temperature.BASE_DIR = root
+            temperature.SENSORS.clear()
+            temperature.PROBES_CONFIG.clear()
+            for i in range(count):
+                name = f"probe{i}"
+                temperature.SENSORS[name] = bus.add_device(FakeW1Bus.device_id(i), 15.0 + i * 0.1)
+                temperature.PROBES_CONFIG[name] = {'min_threshold': -10.0, 'max_threshold': 50.0}
+
+            names = list(temperature.SENSORS)
+            per_device = min(run_cycle(names, bulk=False) for _ in range(args.repeat))
+            bulk = min(run_cycle(names, bulk=True) for _ in range(args.repeat))
+            print(f"{count:>7} | {per_device:>14.3f} | {bulk:>9.3f} | {per_device / bulk:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+load_dotenv()
+
+from app.extensions import db
+from models.rollups import SensorRollup, RollupWatermark
+
+# Same database the app uses (PostgreSQL in production, SQLite in dev)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(PROJECT_ROOT, 'data', 'smart_allotment.db'))
+
+print("Running migration: Create sensor_rollups and rollup_watermarks tables...")
+
+engine = create_engine(DATABASE_URL)
+db.metadata.create_all(engine, tables=[SensorRollup.__table__, RollupWatermark.__table__], checkfirst=True)
+engine.dispose()
+
+print("✅ Created sensor_rollups + rollup_watermarks (skipped any that already existed)")
+print("ℹ️ The rollup job backfills all existing readings on its first run")
+print("✅ Migration 005 complete!")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import time
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()
+
+from models.sensor_data import SensorReading
+from models.alerts import Alert
+
+# Same database the app uses (PostgreSQL in production, SQLite in dev)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(PROJECT_ROOT, 'data', 'smart_allotment.db'))
+
+# Index definitions live on the models (__table_args__) - this builds them on existing tables
+TABLES = [SensorReading.__table__, Alert.__table__]
+
+
+def create_indexes(engine):
+    """
+    Build every model index that is missing.
+    PostgreSQL: CREATE INDEX CONCURRENTLY (no write lock - the sensor loop keeps inserting).
+    It cannot run inside a transaction, so each statement runs in AUTOCOMMIT.
+    SQLite: plain CREATE INDEX IF NOT EXISTS.
+    """
+    postgres = engine.dialect.name == 'postgresql'
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        for table in TABLES:
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                columns = ', '.join(c.name for c in index.columns)
+
+                if postgres:
+                    # A failed CONCURRENTLY build leaves an INVALID index behind - drop and retry it
+                    invalid = conn.execute(text(
+                        "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                        "WHERE c.relname = :name"), {'name': index.name}).scalar()
+                    if invalid:
+                        print(f"⚠️ {index.name} is INVALID from an earlier attempt - rebuilding")
+                        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+                    sql = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {table.name} ({columns})"
+                else:
+                    sql = f"CREATE INDEX IF NOT EXISTS {index.name} ON {table.name} ({columns})"
+
+                started = time.time()
+                conn.execute(text(sql))
+                print(f"✅ {index.name} ON {table.name} ({columns}) - {time.time() - started:.1f}s")
+
+        # Refresh planner statistics so the new indexes get used straight away
+        for table in TABLES:
+            conn.execute(text(f"ANALYZE {table.name}"))
+
+
+if __name__ == '__main__':
+    print("Running migration: Add composite indexes to sensor_readings and alerts...")
+    engine = create_engine(DATABASE_URL)
+    create_indexes(engine)
+    engine.dispose()
+    print("✅ Migration 006 complete!")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, inspect, text
+
+load_dotenv()
+
+from app.extensions import db
+from models.spool import SpoolCheckpoint
+
+# Same database the app uses (PostgreSQL in production, SQLite in dev)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(PROJECT_ROOT, 'data', 'smart_allotment.db'))
+
+print("Running migration: Create reading_spool_checkpoints table...")
+
+engine = create_engine(DATABASE_URL)
+db.metadata.create_all(engine, tables=[SpoolCheckpoint.__table__], checkfirst=True)
+
+# Earlier builds kept the checkpoint in rollup_watermarks as 'reading_spool:<epoch>' -
+# carry it over so records already inserted are not replayed a second time
+if inspect(engine).has_table('rollup_watermarks'):
+    with engine.begin() as conn:
+        legacy = conn.execute(text(
+            "SELECT name, last_id FROM rollup_watermarks WHERE name LIKE 'reading_spool:%'")).all()
+        for name, last_id in legacy:
+            epoch = name.split(':', 1)[1]
+            exists = conn.execute(text("SELECT 1 FROM reading_spool_checkpoints WHERE epoch = :epoch"),
+                                  {'epoch': epoch}).first()
+            if not exists:
+                conn.execute(text("INSERT INTO reading_spool_checkpoints (epoch, last_n) VALUES (:epoch, :n)"),
+                             {'epoch': epoch, 'n': last_id})
+                print(f"✅ Carried over spool checkpoint {epoch} (record {last_id})")
+engine.dispose()
+
+print("✅ Created reading_spool_checkpoints (skipped if it already existed)")
+print("✅ Migration 007 complete!")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Stream sensor_readings to CSV or NDJSON (optionally gzipped) without loading them into memory.
+
+    python scripts/sys_scripts/export_readings.py --probe probe1 --from 2024-03-01 --to 2024-10-01 -o season.csv
+    python scripts/sys_scripts/export_readings.py --type temperature --format ndjson --gzip -o temps.ndjson.gz
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import argparse
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+load_dotenv()
+
+from app.routes._params import parse_time
+from utils.export import EXPORT_CHUNK_ROWS, FORMATS, export_stream
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(PROJECT_ROOT, 'data', 'smart_allotment.db'))
+
+
+def utc_time(text):
+    """--from/--to: ISO 8601, any offset (or Z) -> naive UTC like the stored timestamps"""
+    return parse_time(text, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--probe', action='append', help="probe_id, i.e. the probe's name such as probe1 - not an alert name like Soil-Probe1 (repeatable)")
+    parser.add_argument('--type', help="sensor type, e.g. soil_moisture, temperature, light")
+    parser.add_argument('--from', dest='start', type=utc_time, help="start (ISO 8601; no offset = UTC)")
+    parser.add_argument('--to', dest='end', type=utc_time, help="end, exclusive (ISO 8601; no offset = UTC)")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--gzip', action='store_true', help="gzip-compress the output")
+    parser.add_argument('--chunk', type=int, default=EXPORT_CHUNK_ROWS, help="rows per server-side fetch")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('--url', default=DATABASE_URL, help="database URL")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        with engine.connect() as conn:
+            for block in export_stream(conn, args.format, args.gzip, args.chunk, sensor_type=args.type,
+                                       probes=args.probe, start=args.start, end=args.end):
+                out.write(block)
+                written += len(block)
+    finally:
+        if args.output:
+            out.close()
+        engine.dispose()
+    print(f"Exported {written / (1024 * 1024):.1f}MB", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
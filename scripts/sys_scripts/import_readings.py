@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Bulk-load readings from a CSV or NDJSON file (the export_readings.py / /api/export
+format; .gz accepted) through utils/ingest.py - one bulk INSERT or COPY per chunk.
+
+    python scripts/sys_scripts/import_readings.py season.csv
+    python scripts/sys_scripts/import_readings.py backfill.ndjson.gz --chunk 20000
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import argparse
+import csv
+import gzip
+import json
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+load_dotenv()
+
+from app.extensions.sqlite import configure_sqlite
+from utils.ingest import METHODS, insert_readings, reading_row
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(PROJECT_ROOT, 'data', 'smart_allotment.db'))
+
+
+def parse_time(text):
+    """ISO 8601 -> naive UTC (how sensor_readings stores timestamps)"""
+    parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    return parsed.replace(tzinfo=None) - (parsed.utcoffset() or timedelta(0))
+
+
+def read_records(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    name = path[:-3] if path.endswith('.gz') else path
+    with opener(path, 'rt', newline='') as f:
+        records = (json.loads(line) for line in f if line.strip()) if name.endswith(('.ndjson', '.jsonl')) \
+            else csv.DictReader(f)
+        for record in records:
+            value = record.get('value')
+            if value in (None, ''):
+                continue
+            yield reading_row(record['sensor_type'], record.get('probe_id') or None, float(value),
+                              timestamp=parse_time(record['timestamp']),
+                              device_id=record.get('device_id') or None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help=".csv / .ndjson file, optionally .gz")
+    parser.add_argument('--chunk', type=int, default=10000, help="rows per INSERT/COPY and commit")
+    parser.add_argument('--method', choices=METHODS, default='auto')
+    parser.add_argument('--url', default=DATABASE_URL, help="database URL")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    configure_sqlite(engine)
+    started = time.time()
+    total = 0
+    chunk = []
+    with engine.connect() as conn:
+        for row in read_records(args.path):
+            chunk.append(row)
+            if len(chunk) >= args.chunk:
+                total += insert_readings(conn, chunk, args.method)
+                conn.commit()
+                chunk = []
+        if chunk:
+            total += insert_readings(conn, chunk, args.method)
+            conn.commit()
+    engine.dispose()
+
+    elapsed = time.time() - started
+    print(f"Imported {total:,} readings in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    print("The rollup job folds them into the rollups on its next run")
+
+
+if __name__ == '__main__':
+    main()
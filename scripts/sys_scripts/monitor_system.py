@@ -40,7 +40,8 @@ if mem > 80:
 
 if db_size_mb > 50:
     subject = f"Database Large: {db_size_mb:.1f}MB"
-    body = f"Allotment database has grown to {db_size_mb:.1f}MB. Run cleanup recommended."
+    body = (f"Allotment database has grown to {db_size_mb:.1f}MB. Retention runs from the rollup job; "
+            f"to prune now run: python scripts/sys_scripts/prune_data.py --vacuum")
     admin = True
 
     send_email_alert(subject=subject, body=body, to_email=None, admin=admin)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Apply the retention policies (app/tasks/retention.py) now and report what was reclaimed.
+With RETENTION_ENABLED=true the rollup job does this every RETENTION_INTERVAL seconds; this is for manual runs.
+
+    python scripts/sys_scripts/prune_data.py --dry-run
+    python scripts/sys_scripts/prune_data.py --vacuum     # SQLite: also shrink the file
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import argparse
+from dotenv import load_dotenv
+from flask import Flask
+
+load_dotenv()
+
+from app.extensions import db
+from app.extensions.sqlite import configure_sqlite
+from app.tasks.retention import RETENTION_BATCH, RETENTION_POLICIES, run_retention, vacuum_sqlite
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(PROJECT_ROOT, 'data', 'smart_allotment.db'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help="count what would be pruned, delete nothing")
+    parser.add_argument('--batch', type=int, default=RETENTION_BATCH, help="rows deleted per transaction")
+    parser.add_argument('--vacuum', action='store_true', help="SQLite only: VACUUM afterwards (locks the DB while it runs)")
+    args = parser.parse_args()
+
+    # Bare app for the DB session only - create_app() would start the sensor loop
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        configure_sqlite(db.engine)
+        print("Retention policies: " + ", ".join(
+            f"{level}={keep.days if keep else 'forever'}{'d' if keep else ''}" for level, keep in RETENTION_POLICIES.items()))
+        report = run_retention(batch_size=args.batch, dry_run=args.dry_run)
+
+        prefix = "Would prune" if args.dry_run else "Pruned"
+        for level in RETENTION_POLICIES:
+            print(f"{prefix} {level:>6}: {report[level]} rows")
+        if report['archive']:
+            print(f"  ({report['archive']} of the raw rows are in the archive files)")
+        if report['partitions']:
+            print(f"{prefix} partitions: {', '.join(report['partitions'])}")
+        if report['bytes'] is not None:
+            print(f"Reclaimed: {report['bytes'] / (1024 * 1024):.1f}MB")
+
+        if args.vacuum and not args.dry_run:
+            saved = vacuum_sqlite()
+            if saved is None:
+                print("VACUUM skipped (not SQLite)")
+            else:
+                print(f"VACUUM shrank the database file by {saved / (1024 * 1024):.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import os
+from typing import Dict
+
+# =============================
+# FAKE 1-WIRE SYSFS TREE
+# =============================
+# Mirrors the parts of /sys/bus/w1/devices/ that sensors/temperature.py touches,
+# so the DS18B20 driver (per-device and bulk paths) runs without hardware.
+# Point the driver at it with W1_BASE_DIR=<root> or temperature.BASE_DIR = root.
+
+
+class FakeW1Bus:
+    """
+    Builds <root>/w1_bus_master1/therm_bulk_read plus one <root>/28-xxxxxxxxxxxx/
+    directory per device holding `w1_slave` (kernel two-line format) and
+    `temperature` (millidegrees).
+    """
+
+    def __init__(self, root: str, bulk: bool = True):
+        self.root = root
+        self.devices: Dict[str, float] = {}
+        os.makedirs(os.path.join(root, 'w1_bus_master1'), exist_ok=True)
+        if bulk:
+            self._write(os.path.join(root, 'w1_bus_master1', 'therm_bulk_read'), '0\n')
+
+    @staticmethod
+    def _write(path: str, content: str):
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def add_device(self, device_id: str, temp_c: float = 20.0, crc_ok: bool = True) -> str:
+        """Create a DS18B20 and return the path of its w1_slave file"""
+        os.makedirs(os.path.join(self.root, device_id), exist_ok=True)
+        self.set_temperature(device_id, temp_c, crc_ok)
+        return os.path.join(self.root, device_id, 'w1_slave')
+
+    def set_temperature(self, device_id: str, temp_c: float, crc_ok: bool = True):
+        self.devices[device_id] = temp_c
+        milli = int(round(temp_c * 1000))
+        raw = milli & 0xFFFF
+        scratch = f"{raw & 0xFF:02x} {raw >> 8:02x} 4b 46 7f ff 0c 10 1c"
+        crc = 'YES' if crc_ok else 'NO'
+        device_dir = os.path.join(self.root, device_id)
+        self._write(os.path.join(device_dir, 'w1_slave'),
+                    f"{scratch} : crc=1c {crc}\n{scratch} t={milli}\n")
+        self._write(os.path.join(device_dir, 'temperature'), f"{milli}\n")
+
+    @staticmethod
+    def device_id(index: int) -> str:
+        """Stable fake DS18B20 ROM id for probe number `index`"""
+        return f"28-{index:012x}"
@@ -0,0 +1,211 @@
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from utils.logger import get_logger
+
+# =============================
+# Setup Logging
+# =============================
+
+logger = get_logger("sensors")
+
+# =============================
+# HARDWARE ABSTRACTION LAYER
+# =============================
+# The sensor modules ask this layer for driver objects instead of opening
+# buses at import time:
+#   analog_channel(pin, key) -> object with .voltage   (ADS1115 input)
+#   light_sensor(address, key) -> object with .lux     (BH1750)
+#   w1_base_dir() / w1_prepare(device_ids)              (DS18B20 sysfs tree)
+# SENSOR_BACKEND picks the implementation:
+#   adafruit - real drivers; the I2C bus and ADC are opened on first use
+#   sim      - deterministic simulated probes (no Pi needed), with latency,
+#              noise and failure rate from SIM_* env vars
+SENSOR_BACKEND = os.getenv('SENSOR_BACKEND', 'adafruit')
+
+SIM_SEED = os.getenv('SIM_SEED', '42')
+SIM_LATENCY_MS = float(os.getenv('SIM_LATENCY_MS', '5'))       # per read (I2C transaction time)
+SIM_JITTER_MS = float(os.getenv('SIM_JITTER_MS', '1'))
+SIM_NOISE = float(os.getenv('SIM_NOISE', '0.02'))              # fraction of the signal range
+SIM_FAILURE_RATE = float(os.getenv('SIM_FAILURE_RATE', '0'))   # chance a read raises OSError
+SIM_W1_DIR = os.getenv('SIM_W1_DIR', os.path.join(tempfile.gettempdir(), 'smart_allotment_sim_w1'))
+
+
+class AdafruitBackend:
+    """Real drivers. board/busio/adafruit_* are imported and opened lazily, once."""
+
+    name = 'adafruit'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._i2c = None
+        self._ads = None
+
+    def i2c(self):
+        with self._lock:
+            if self._i2c is None:
+                import board
+                import busio
+                self._i2c = busio.I2C(board.SCL, board.SDA)
+                logger.info("Opened I2C bus")
+            return self._i2c
+
+    def adc(self):
+        bus = self.i2c()
+        with self._lock:
+            if self._ads is None:
+                from adafruit_ads1x15.ads1115 import ADS1115
+                self._ads = ADS1115(bus)
+                logger.info("Opened ADS1115")
+            return self._ads
+
+    def adc_pin(self, channel: str):
+        """ADS1115 pin for a channel name like 'A0' (AttributeError if invalid)"""
+        from adafruit_ads1x15.ads1x15 import Pin
+        return getattr(Pin, channel)
+
+    def analog_channel(self, channel: str, key: str = None):
+        from adafruit_ads1x15.analog_in import AnalogIn
+        return AnalogIn(self.adc(), self.adc_pin(channel))
+
+    def light_sensor(self, address: int, key: str = None):
+        import adafruit_bh1750
+        return adafruit_bh1750.BH1750(self.i2c(), address=address)
+
+    def w1_base_dir(self) -> str:
+        return os.getenv('W1_BASE_DIR', '/sys/bus/w1/devices/')
+
+    def w1_prepare(self, device_ids: Iterable[str]):
+        """Real DS18B20s need nothing before a read"""
+
+
+# =============================
+# SIMULATED BACKEND
+# =============================
+class _SimSignal:
+    """
+    Deterministic signal for one probe: slow sine around `base` plus Gaussian noise.
+    Same seed + probe key -> same sequence of readings on every run.
+    """
+
+    def __init__(self, key: str, base: float, amplitude: float, span: float, period: int):
+        self.rng = random.Random(f"{SIM_SEED}:{key}")
+        self.phase = self.rng.uniform(0, 2 * math.pi)
+        self.base, self.amplitude, self.span, self.period = base, amplitude, span, period
+        self.step = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> float:
+        with self._lock:
+            self.step += 1
+            if SIM_LATENCY_MS or SIM_JITTER_MS:
+                time.sleep(max(0.0, SIM_LATENCY_MS + self.rng.uniform(-SIM_JITTER_MS, SIM_JITTER_MS)) / 1000)
+            if SIM_FAILURE_RATE and self.rng.random() < SIM_FAILURE_RATE:
+                raise OSError("simulated I2C read failure")
+            wave = math.sin(self.phase + 2 * math.pi * self.step / self.period)
+            return self.base + self.amplitude * wave + self.rng.gauss(0, SIM_NOISE * self.span)
+
+
+class SimAnalogChannel:
+    """ADS1115 input: voltage between wet (~1.0V) and dry (~2.48V)"""
+
+    def __init__(self, key: str):
+        self._signal = _SimSignal(key, base=1.75, amplitude=0.45, span=1.5, period=720)
+
+    @property
+    def voltage(self) -> float:
+        return self._signal.next()
+
+
+class SimLightSensor:
+    """BH1750: daylight-shaped lux, never negative"""
+
+    def __init__(self, key: str):
+        self._signal = _SimSignal(key, base=8000, amplitude=12000, span=20000, period=1440)
+
+    @property
+    def lux(self) -> float:
+        return max(0.0, self._signal.next())
+
+
+class SimBackend:
+    """Simulated probes for development and benchmarks on any Linux box."""
+
+    name = 'sim'
+
+    def __init__(self, w1_root: str = SIM_W1_DIR):
+        self._lock = threading.Lock()
+        self._w1 = None
+        self._w1_root = w1_root
+        self._temps: Dict[str, _SimSignal] = {}
+
+    def adc_pin(self, channel: str):
+        return channel  # virtual ADC: any channel name, so hundreds of probes fit
+
+    def analog_channel(self, channel: str, key: str = None):
+        return SimAnalogChannel(key or channel)
+
+    def light_sensor(self, address: int, key: str = None):
+        return SimLightSensor(key or f"0x{address:02x}")
+
+    def _bus(self):
+        with self._lock:
+            if self._w1 is None:
+                from sensors.fake_w1 import FakeW1Bus
+                self._w1 = FakeW1Bus(self._w1_root, bulk=True)
+                logger.info(f"Simulated 1-Wire bus at {self._w1_root}")
+            return self._w1
+
+    def w1_base_dir(self) -> str:
+        self._bus()
+        return self._w1_root
+
+    def w1_prepare(self, device_ids: Iterable[str]):
+        """Write this cycle's simulated temperature for each DS18B20 (creating it on first use)"""
+        bus = self._bus()
+        for device_id in device_ids:
+            signal = self._temps.get(device_id)
+            if signal is None:
+                signal = self._temps[device_id] = _SimSignal(device_id, base=15, amplitude=6, span=30, period=1440)
+            try:
+                temp_c, crc_ok = signal.next(), True
+            except OSError:
+                # Simulated failure shows up the way a real one does: a bad CRC line
+                temp_c, crc_ok = bus.devices.get(device_id, 0.0), False
+            if device_id in bus.devices:
+                bus.set_temperature(device_id, temp_c, crc_ok)
+            else:
+                bus.add_device(device_id, temp_c, crc_ok)
+            if not crc_ok:
+                # ...and the bulk-read `temperature` attribute comes back empty
+                open(os.path.join(self._w1_root, device_id, 'temperature'), 'w').close()
+
+
+BACKENDS = {
+    'adafruit': AdafruitBackend,
+    'sim': SimBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def backend():
+    """The active backend (created on first use from SENSOR_BACKEND)"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if SENSOR_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown SENSOR_BACKEND '{SENSOR_BACKEND}' - use one of {sorted(BACKENDS)}")
+            _backend = BACKENDS[SENSOR_BACKEND]()
+            logger.info(f"Sensor backend: {_backend.name}")
+        return _backend
+
+def set_backend(instance) -> None:
+    """Swap the backend (tests/benchmarks); sensor modules pick it up on their next init"""
+    global _backend
+    with _backend_lock:
+        _backend = instance
@@ -1,11 +1,11 @@
 import logging
-import board
-import busio
-import adafruit_bh1750
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from flask import current_app
 from models.probes import Probe
+from sensors import hal
+from sensors.registry import registry
 from utils.logger import get_logger
+from utils.metrics import metrics
 import time
 
 
@@ -18,10 +18,9 @@ logger = get_logger("sensors")
 # =============================
 # GLOBAL STATE
 # =============================
+BUS = 'i2c-bh1750'  # acquisition worker key - one worker per physical bus
 PROBES_CONFIG: Dict[str, Dict] = {}
-SENSORS: Dict[str, adafruit_bh1750.BH1750] = {}
-
-_i2c = busio.I2C(board.SCL, board.SDA)
+SENSORS: Dict[str, object] = {}  # {probe_name: BH1750 from the HAL} - the I2C bus opens on first use
 
 # =============================
 # DYNAMIC PROBES FROM DATABASE
@@ -80,8 +79,9 @@ def light_init_channels():
     for name, config in PROBES_CONFIG.items():
         logger.info(f"Trying BH1750({name}) at addr=0x{config['address']:02X}")
         try:
-            time.sleep(0.1)
-            sensor = adafruit_bh1750.BH1750(_i2c, address=config['address'])
+            if hal.backend().name == 'adafruit':
+                time.sleep(0.1)  # let the real BH1750 settle between inits
+            sensor = hal.backend().light_sensor(config['address'], key=name)
             SENSORS[name] = sensor
             logger.info(f"Initialized BH1750 for light probe {name}")
         except Exception as e:
@@ -90,6 +90,9 @@ def light_init_channels():
             import traceback
             logger.error(f"TRACEBACK: {''.join(traceback.format_exception(type(e), e, e.__traceback__))}")
 
+    version = registry.publish('light', PROBES_CONFIG)
+    logger.info(f"Published {len(PROBES_CONFIG)} light probes (registry v{version})")
+
 # =============================
 # READ SINGLE LIGHT PROBE
 # =============================
@@ -148,16 +151,29 @@ def read(probe_name: str = None) -> Optional[float]:
 # =============================
 # READ ALL ACTIVE LIGHT PROBES
 # =============================
-def read_all() -> Dict[str, Optional[float]]:
+def active_probes() -> List[str]:
+    """Names of active light probes from the in-memory registry (reloads from DB only when stale)"""
+    if registry.is_stale('light'):
+        refresh_channels()
+    return list(registry.get('light').keys())
+
+def read_all(probe_names: Optional[List[str]] = None,
+             results: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, Optional[float]]:
     """
-    Read all ACTIVE light probes from database.
-    Returns {probe_name: lux or None}.
+    Read ACTIVE light probes (default: all in the registry).
+    Fills `results` as each probe answers so a caller's deadline can
+    report the ones still missing. Returns {probe_name: lux or None}.
     """
-    results: Dict[str, Optional[float]] = {}
-    light_probes = get_active_light_probes()
+    if results is None:
+        results = {}
+    if probe_names is None:
+        probe_names = active_probes()
 
-    for probe_name in light_probes.keys():
+    for probe_name in probe_names:
+        started = time.perf_counter()
         results[probe_name] = read(probe_name)
+        metrics.observe('sensor_probe_read_seconds', time.perf_counter() - started,
+                        sensor_type='light', probe=probe_name)
 
     logger.info(f"Read all light probes: {results}")
     return results
@@ -0,0 +1,112 @@
+import os
+import threading
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from models.probes import Probe
+from utils.logger import get_logger
+
+# =============================
+# Setup Logging
+# =============================
+
+logger = get_logger("sensors")
+
+# =============================
+# SHARED STAMP FILE
+# =============================
+# Probe rows are edited from gunicorn workers, but the sensor loop runs in
+# whichever worker holds /tmp/sensor_loop.lock. Bumping this file's mtime is
+# how a probe change in one process invalidates the registry in the others.
+STAMP_PATH = os.getenv('PROBE_REGISTRY_STAMP', '/tmp/probe_registry.stamp')
+
+
+class ProbeRegistry:
+    """
+    Versioned in-memory cache of active probe configs, keyed by Probe.sensor_type
+    ('soil', 'temperature', 'light'). Sensor modules publish() after *_init_channels()
+    and read_all() reads from here instead of running Probe.query every cycle.
+    """
+
+    def __init__(self, stamp_path: str = STAMP_PATH):
+        self.stamp_path = stamp_path
+        self._lock = threading.Lock()
+        self._configs: Dict[str, Dict[str, Dict]] = {}
+        self._versions: Dict[str, int] = {}
+        self._stamps: Dict[str, Optional[int]] = {}
+        self._stale = set()
+
+    def _read_stamp(self) -> Optional[int]:
+        try:
+            return os.stat(self.stamp_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def stamp(self) -> Optional[int]:
+        """Shared stamp (mtime_ns) - changes whenever any process edits a probe."""
+        return self._read_stamp()
+
+    def publish(self, sensor_type: str, config: Dict[str, Dict]) -> int:
+        """Store a freshly loaded config and return its new version."""
+        with self._lock:
+            self._configs[sensor_type] = dict(config)
+            self._versions[sensor_type] = self._versions.get(sensor_type, 0) + 1
+            self._stamps[sensor_type] = self._read_stamp()
+            self._stale.discard(sensor_type)
+            return self._versions[sensor_type]
+
+    def get(self, sensor_type: str) -> Dict[str, Dict]:
+        """Return the cached config for sensor_type (empty if never published)."""
+        return self._configs.get(sensor_type, {})
+
+    def version(self, sensor_type: str) -> int:
+        return self._versions.get(sensor_type, 0)
+
+    def is_stale(self, sensor_type: str) -> bool:
+        """True if never loaded, invalidated locally, or the shared stamp moved."""
+        if sensor_type not in self._configs or sensor_type in self._stale:
+            return True
+        return self._read_stamp() != self._stamps.get(sensor_type)
+
+    def invalidate(self, sensor_type: Optional[str] = None):
+        """Mark one (or every) sensor type stale here and in other processes."""
+        with self._lock:
+            if sensor_type is None:
+                self._stale.update(self._configs.keys())
+            else:
+                self._stale.add(sensor_type)
+        try:
+            with open(self.stamp_path, 'a'):
+                os.utime(self.stamp_path, None)
+        except OSError as e:
+            logger.warning(f"Could not touch probe registry stamp {self.stamp_path}: {e}")
+
+
+registry = ProbeRegistry()
+
+# =============================
+# INVALIDATE ON PROBE ROW CHANGES
+# =============================
+# Changes are collected per session and only applied after COMMIT, so the
+# sensor loop never reloads a config that is about to be rolled back.
+
+def _track_probe_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('probe_types_changed', set()).add(target.sensor_type)
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Probe, _event_name, _track_probe_change)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    changed = session.info.pop('probe_types_changed', None)
+    for sensor_type in changed or ():
+        logger.info(f"Probe rows changed ({sensor_type}) - registry invalidated")
+        registry.invalidate(sensor_type)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('probe_types_changed', None)
@@ -1,13 +1,12 @@
 import logging
-import board
-import busio
-from adafruit_ads1x15.ads1x15 import Pin
-from adafruit_ads1x15.ads1115 import ADS1115
-from adafruit_ads1x15.analog_in import AnalogIn
-from typing import Dict, Optional
+import time
+from typing import Dict, List, Optional
 from flask import current_app
 from models.probes import Probe
+from sensors import hal
+from sensors.registry import registry
 from utils.logger import get_logger
+from utils.metrics import metrics
 
 # =============================
 # Setup Logging
@@ -18,10 +17,9 @@ logger = get_logger("sensors")
 # =============================
 # GLOBAL STATE
 # =============================
+BUS = 'i2c-ads1115'  # acquisition worker key - one worker per physical bus
 PROBES_CONFIG = {}
-CHANNELS = {}
-i2c = busio.I2C(board.SCL, board.SDA)
-ads = ADS1115(i2c)
+CHANNELS = {}  # {probe_name: ADC input from the HAL} - the I2C bus opens on first use
 
 # =============================
 # DYNAMIC PROBES FROM DATABASE
@@ -35,9 +33,9 @@ def get_active_soil_probes() -> Dict[str, Dict]:
         
         for probe in probes:
             try:
-                channel_pin = getattr(Pin, probe.channel)
+                hal.backend().adc_pin(probe.channel)  # validate ('A0'..'A3' on a real ADS1115)
                 probe_config[probe.name] = {
-                    'channel': channel_pin,
+                    'channel': probe.channel,
                     'dry': probe.dry_voltage or 2.48,
                     'wet': probe.wet_voltage or 1.0,
                     'min_threshold': probe.min_value or 20,
@@ -60,8 +58,14 @@ def soil_init_channels():
     
     CHANNELS.clear()
     for name, config in PROBES_CONFIG.items():
-        CHANNELS[name] = AnalogIn(ads, config['channel'])
-        logger.info(f"Initialized channel for {name}")
+        try:
+            CHANNELS[name] = hal.backend().analog_channel(config['channel'], key=name)
+            logger.info(f"Initialized channel for {name}")
+        except Exception as e:
+            logger.error(f"Failed to open ADC channel {config['channel']} for {name}: {e}")
+
+    version = registry.publish('soil', PROBES_CONFIG)
+    logger.info(f"Published {len(PROBES_CONFIG)} soil probes (registry v{version})")
 
 # =============================
 # READ SINGLE PROBE
@@ -102,14 +106,26 @@ def read(probe_name: str) -> Optional[float]:
 # =============================
 # READ ALL ACTIVE SOIL PROBES
 # =============================
-def read_all() -> Dict[str, Optional[float]]:
-    """Read all ACTIVE SOIL probes from database"""
-    results = {}
-    soil_probes = get_active_soil_probes()
-    
-    for probe_name in soil_probes.keys():
+def active_probes() -> List[str]:
+    """Names of active soil probes from the in-memory registry (reloads from DB only when stale)"""
+    if registry.is_stale('soil'):
+        refresh_channels()
+    return list(registry.get('soil').keys())
+
+def read_all(probe_names: Optional[List[str]] = None,
+             results: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, Optional[float]]:
+    """Read ACTIVE soil probes (default: all in the registry), filling `results` as each answers"""
+    if results is None:
+        results = {}
+    if probe_names is None:
+        probe_names = active_probes()
+
+    for probe_name in probe_names:
+        started = time.perf_counter()
         results[probe_name] = read(probe_name)
-    
+        metrics.observe('sensor_probe_read_seconds', time.perf_counter() - started,
+                        sensor_type='soil', probe=probe_name)
+
     logger.info(f"Read all soil probes: {results}")
     return results
 
@@ -119,7 +135,7 @@ def read_all() -> Dict[str, Optional[float]]:
 
 def refresh_channels():
     """Re-scan DB and refresh active sensors."""
-    global PROBES_CONFIG, SENSORS
+    global PROBES_CONFIG, CHANNELS
     logger.info("🔄 Refreshing soil moisture probes from DB...")
     soil_init_channels()  # Re-runs full init
-    logger.info(f"Refreshed: {len(SENSORS)} active soil moisture probes")
\ No newline at end of file
+    logger.info(f"Refreshed: {len(CHANNELS)} active soil moisture probes")
\ No newline at end of file
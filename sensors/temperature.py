@@ -1,10 +1,13 @@
 import glob
 import time
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from flask import current_app
 from models.probes import Probe
+from sensors import hal
+from sensors.registry import registry
 from utils.logger import get_logger
+from utils.metrics import metrics
 
 # =============================
 # Setup Logging
@@ -15,10 +18,16 @@ logger = get_logger("sensors")
 # =============================
 # GLOBAL STATE
 # =============================
+BUS = 'w1'  # acquisition worker key - one worker per physical bus
 PROBES_CONFIG: Dict[str, Dict] = {}
 SENSORS: Dict[str, str] = {}  # {probe_name: device_file_path}
 
-BASE_DIR = '/sys/bus/w1/devices/'
+BASE_DIR = os.getenv('W1_BASE_DIR')  # None = ask the HAL (sysfs, or the simulated tree); set to force a path
+CONVERSION_SECS = float(os.getenv('W1_CONVERSION_SECS', '0.8'))  # DS18B20 12-bit conversion time (750ms + margin)
+BULK_READ = os.getenv('W1_BULK_READ', '1') != '0'  # one conversion for the whole bus via therm_bulk_read
+
+def _base_dir() -> str:
+    return BASE_DIR or hal.backend().w1_base_dir()
 
 # =============================
 # DYNAMIC PROBES FROM DATABASE
@@ -31,11 +40,12 @@ def get_active_temp_probes() -> Dict[str, Dict]:
     with current_app.app_context():
         probes = Probe.query.filter_by(active=True, sensor_type='temperature').all()
         probe_config: Dict[str, Dict] = {}
+        hal.backend().w1_prepare([probe.channel for probe in probes])  # simulated devices appear here
 
         for probe in probes:
             try:
                 # Expect channel like DS18B20 ID: "28-0b25516af7db"
-                device_path = os.path.join(BASE_DIR, probe.channel, 'w1_slave')
+                device_path = os.path.join(_base_dir(), probe.channel, 'w1_slave')
                 
                 # Verify device exists
                 if not os.path.exists(device_path):
@@ -71,59 +81,105 @@ def temp_init_channels():
         SENSORS[name] = config['device_file']
         logger.info(f"Initialized DS18B20 for temp probe {name}")
     
-    logger.info(f"Found {len(SENSORS)} temperature probes ready")
+    version = registry.publish('temperature', PROBES_CONFIG)
+    logger.info(f"Found {len(SENSORS)} temperature probes ready (registry v{version})")
 
 # =============================
-# READ SINGLE TEMP PROBE
+# BULK CONVERSION (therm_bulk_read)
 # =============================
-def read(probe_name: str = None) -> Optional[float]:
+def _bulk_read_files() -> List[str]:
+    """therm_bulk_read attribute of every 1-Wire bus master (kernel 5.10+)"""
+    return sorted(glob.glob(os.path.join(_base_dir(), 'w1_bus_master*', 'therm_bulk_read')))
+
+def bulk_convert() -> bool:
     """
-    Read specific temperature probe from database config.
-    If probe_name is None, read first active probe.
+    Start ONE temperature conversion on every device of every bus master and wait once.
+    Returns False if the kernel has no bulk interface (caller falls back to per-device reads).
     """
-    #probes = get_active_temp_probes()
-    #if not probes:
-    #    logger.error("No active temperature probes found")
-    #    return None
+    files = _bulk_read_files()
+    triggered = []
+    for path in files:
+        try:
+            with open(path, 'w') as f:
+                f.write('trigger\n')
+            triggered.append(path)
+        except OSError as e:
+            logger.warning(f"therm_bulk_read trigger failed on {path}: {e}")
+
+    if not triggered:
+        return False
+
+    time.sleep(CONVERSION_SECS)
+
+    # Kernel reports -1 while any conversion is still running; give it a short grace period
+    deadline = time.monotonic() + CONVERSION_SECS / 2
+    for path in triggered:
+        while time.monotonic() < deadline:
+            try:
+                with open(path, 'r') as f:
+                    if f.read().strip() != '-1':
+                        break
+            except OSError:
+                break
+            time.sleep(0.05)
 
-    # Default to first probe
-    #if probe_name is None:
-    #    probe_name = next(iter(probes.keys()))
+    logger.info(f"Bulk conversion done on {len(triggered)} bus master(s)")
+    return True
 
-    #if probe_name not in probes:
-    #    logger.error(f"Unknown temp probe: {probe_name}")
-    #    return None
+def _read_celsius(device_file: str, prefer_attr: bool) -> Optional[float]:
+    """
+    Parse one DS18B20. After a bulk conversion the sibling `temperature` attribute
+    (millidegrees) returns the latched value without converting again.
+    """
+    temp_attr = os.path.join(os.path.dirname(device_file), 'temperature')
+    if prefer_attr and os.path.exists(temp_attr):
+        with open(temp_attr, 'r') as f:
+            raw = f.read().strip()
+        return float(raw) / 1000.0 if raw else None
+
+    # Read raw DS18B20 data
+    with open(device_file, 'r') as f:
+        lines = f.readlines()
+
+    if len(lines) >= 2 and lines[0].strip().endswith('YES'):
+        temp_string = lines[1][lines[1].find('t=')+2:]
+        if temp_string.strip():
+            return float(temp_string) / 1000.0
+    return None
 
+# =============================
+# READ SINGLE TEMP PROBE
+# =============================
+def read(probe_name: str = None, convert: bool = True) -> Optional[float]:
+    """
+    Read specific temperature probe from database config.
+    convert=False skips the settle wait because bulk_convert() already ran.
+    """
     try:
         device_file = SENSORS.get(probe_name)
         if not device_file or not os.path.exists(device_file):
             logger.warning(f"DS18B20 device file missing for {probe_name}")
             return None
 
-        time.sleep(0.8) # DS18B20 needs settle time - trigger conversion
-
-        # Read raw DS18B20 data
-        with open(device_file, 'r') as f:
-            lines = f.readlines()
-        
-        if len(lines) >= 2 and lines[0].strip().endswith('YES'):
-            temp_string = lines[1][lines[1].find('t=')+2:]
-            if temp_string:
-                temp_c = float(temp_string) / 1000.0
-                result = round(temp_c, 1)
-                
-                config = PROBES_CONFIG[probe_name]
-                # Threshold warnings
-                if result < config['min_threshold']:
-                    logger.warning(f"{probe_name}: {result}°C below min {config['min_threshold']}")
-                if result > config['max_threshold']:
-                    logger.warning(f"{probe_name}: {result}°C above max {config['max_threshold']}")
-                
-                logger.info(f"{probe_name}: {result}°C")
-                return result
-        else:
+        if convert:
+            time.sleep(CONVERSION_SECS) # DS18B20 needs settle time - trigger conversion
+
+        temp_c = _read_celsius(device_file, prefer_attr=not convert)
+        if temp_c is None:
             logger.warning(f"DS18B20 CRC check failed for {probe_name}")
             return None
+
+        result = round(temp_c, 1)
+
+        config = PROBES_CONFIG[probe_name]
+        # Threshold warnings
+        if result < config['min_threshold']:
+            logger.warning(f"{probe_name}: {result}°C below min {config['min_threshold']}")
+        if result > config['max_threshold']:
+            logger.warning(f"{probe_name}: {result}°C above max {config['max_threshold']}")
+
+        logger.info(f"{probe_name}: {result}°C")
+        return result
             
     except Exception as e:
         logger.error(f"Error reading temp probe {probe_name}: {e}")
@@ -133,15 +189,31 @@ def read(probe_name: str = None) -> Optional[float]:
 # =============================
 # READ ALL ACTIVE TEMP PROBES
 # =============================
-def read_all() -> Dict[str, Optional[float]]:
-    """Read all ACTIVE temperature probes from database."""
-    results: Dict[str, Optional[float]] = {}
-    temp_probes = get_active_temp_probes()
-
-    for probe_name in temp_probes.keys():
-        results[probe_name] = read(probe_name)
-
-    logger.info(f"Read all temp probes: {results}")
+def active_probes() -> List[str]:
+    """Names of active temp probes from the in-memory registry (reloads from DB only when stale)"""
+    if registry.is_stale('temperature'):
+        refresh_channels()
+    return list(registry.get('temperature').keys())
+
+def read_all(probe_names: Optional[List[str]] = None,
+             results: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, Optional[float]]:
+    """Read ACTIVE temperature probes (default: all in the registry), filling `results` as each answers."""
+    if results is None:
+        results = {}
+    if probe_names is None:
+        probe_names = active_probes()
+    hal.backend().w1_prepare(os.path.basename(os.path.dirname(SENSORS[name])) for name in probe_names if name in SENSORS)
+
+    # Bulk mode: one conversion for the whole bus, then a single pass over the files
+    bulk = BULK_READ and len(probe_names) > 1 and bulk_convert()
+
+    for probe_name in probe_names:
+        started = time.perf_counter()
+        results[probe_name] = read(probe_name, convert=not bulk)
+        metrics.observe('sensor_probe_read_seconds', time.perf_counter() - started,
+                        sensor_type='temperature', probe=probe_name)
+
+    logger.info(f"Read all temp probes ({'bulk' if bulk else 'per-device'}): {results}")
     return results
 
 # =============================
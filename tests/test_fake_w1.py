@@ -0,0 +1,90 @@
+import pytest
+from sensors import hal, temperature
+from sensors.fake_w1 import FakeW1Bus
+
+
+@pytest.fixture
+def bus(tmp_path, monkeypatch):
+    """A fake bus with therm_bulk_read, and the DS18B20 driver pointed at it"""
+    monkeypatch.setattr(hal, '_backend', hal.AdafruitBackend())  # w1_prepare is a no-op
+    monkeypatch.setattr(temperature, 'BASE_DIR', str(tmp_path))
+    monkeypatch.setattr(temperature, 'CONVERSION_SECS', 0)
+    monkeypatch.setattr(temperature, 'BULK_READ', True)
+    monkeypatch.setattr(temperature, 'SENSORS', {})
+    monkeypatch.setattr(temperature, 'PROBES_CONFIG', {})
+    return FakeW1Bus(str(tmp_path), bulk=True)
+
+
+def add_probe(bus, name, index, temp_c, crc_ok=True):
+    device_file = bus.add_device(bus.device_id(index), temp_c, crc_ok)
+    temperature.SENSORS[name] = device_file
+    temperature.PROBES_CONFIG[name] = {'device_file': device_file, 'min_threshold': -10.0,
+                                       'max_threshold': 50.0, 'description': ''}
+    return device_file
+
+
+def bulk_trigger(bus):
+    with open(f"{bus.root}/w1_bus_master1/therm_bulk_read") as f:
+        return f.read().strip()
+
+
+# =============================
+# BULK CONVERSION
+# =============================
+def test_bulk_conversion_reads_latched_temperature_attribute(bus):
+    add_probe(bus, 'bed1', 1, 21.5)
+    add_probe(bus, 'bed2', 2, -3.25)
+    # w1_slave would fail CRC - bulk mode must read the `temperature` attribute instead
+    bus.set_temperature(bus.device_id(1), 21.5, crc_ok=False)
+    with open(f"{bus.root}/{bus.device_id(1)}/temperature", 'w') as f:
+        f.write("21500\n")
+
+    results = temperature.read_all(['bed1', 'bed2'])
+
+    assert bulk_trigger(bus) == 'trigger'
+    assert results == {'bed1': 21.5, 'bed2': -3.2}
+
+
+def test_bulk_conversion_empty_attribute_is_a_failed_read(bus):
+    add_probe(bus, 'bed1', 1, 18.0)
+    add_probe(bus, 'bed2', 2, 19.0)
+    open(f"{bus.root}/{bus.device_id(2)}/temperature", 'w').close()
+
+    assert temperature.read_all(['bed1', 'bed2']) == {'bed1': 18.0, 'bed2': None}
+
+
+# =============================
+# PER-DEVICE FALLBACK
+# =============================
+def test_single_probe_skips_bulk_conversion(bus):
+    add_probe(bus, 'bed1', 1, 12.0)
+
+    assert temperature.read_all(['bed1']) == {'bed1': 12.0}
+    assert bulk_trigger(bus) == '0'
+
+
+def test_no_bulk_interface_falls_back_to_per_device(tmp_path, bus):
+    (tmp_path / 'w1_bus_master1' / 'therm_bulk_read').unlink()
+    add_probe(bus, 'bed1', 1, 7.5)
+    add_probe(bus, 'bed2', 2, 8.5)
+
+    assert temperature.bulk_convert() is False
+    assert temperature.read_all(['bed1', 'bed2']) == {'bed1': 7.5, 'bed2': 8.5}
+
+
+# =============================
+# CRC REJECTION
+# =============================
+def test_crc_no_is_rejected(bus):
+    device_file = add_probe(bus, 'bed1', 1, 25.0, crc_ok=False)
+
+    assert temperature._read_celsius(device_file, prefer_attr=False) is None
+    assert temperature.read('bed1', convert=True) is None
+
+
+def test_crc_recovers_on_next_good_read(bus):
+    add_probe(bus, 'bed1', 1, 25.0, crc_ok=False)
+    assert temperature.read('bed1') is None
+
+    bus.set_temperature(bus.device_id(1), 26.0)
+    assert temperature.read('bed1') == 26.0
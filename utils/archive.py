@@ -0,0 +1,278 @@
+# utils/archive.py
+"""
+Columnar cold storage for old sensor readings.
+
+One .npy file per sensor type, probe, device and month:
+
+    <ARCHIVE_DIR>/<sensor_type>/<probe>/<YYYY-MM>.npy            (device_id NULL)
+    <ARCHIVE_DIR>/<sensor_type>/<probe>/<YYYY-MM>@<device_id>.npy
+
+Names are percent-encoded (anything outside [A-Za-z0-9_-]), so every probe gets
+its own directory and files() hands back the exact probe_id; readings with no
+probe_id live under '%none'.
+
+Each file is a structured array sorted by time, dtype [('t', '<u4'), ('v', '<f8')].
+'t' is seconds since the start of the month, 'v' is the reading (full double
+precision, as stored in the DB). That is 12 bytes a reading against roughly 100
+for a sensor_readings row plus its indexes. Files are plain (uncompressed) .npy
+so readers can np.load(mmap_mode='r') them and binary-search a range without
+reading the rest of the file. Measured with scripts/benchmarks/bench_archive.py
+(3 months x 3 probes at 1/min): 12.0 bytes a reading against 172.2 in SQLite,
+a 14x shrink; zlib on a month file would only halve it again, at the cost of
+the memory-mapped range reads. prune() drops whatever falls out of the retention
+window.
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger("app")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join(PROJECT_ROOT, 'data', 'archive'))
+
+ARCHIVE_DTYPE = np.dtype([('t', '<u4'), ('v', '<f8')])
+
+# Directory of readings with no probe_id. Never a _quote() result: there '%' is always followed by two hex digits.
+_NULL_PROBE = '%none'
+
+
+def _quote(name: str) -> str:
+    """Reversible file-name form of a sensor type, probe or device id (only [A-Za-z0-9_-] kept as-is)"""
+    return quote(name, safe='').replace('.', '%2E').replace('~', '%7E')
+
+
+def month_start(ts: datetime) -> datetime:
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+class ColumnarArchive:
+    """Append/read interface over the per-probe monthly .npy files."""
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._maps: Dict[str, Tuple[Tuple, np.ndarray]] = {}  # path -> (stat key, memmap)
+
+    def _probe_dir(self, sensor_type: str, probe: Optional[str]) -> str:
+        probe_dir = _quote(probe) if probe else _NULL_PROBE
+        return os.path.join(self.root, _quote(sensor_type), probe_dir)
+
+    def path(self, sensor_type: str, probe: Optional[str], month: datetime, device: Optional[str] = None) -> str:
+        suffix = f"@{_quote(device)}" if device else ''
+        return os.path.join(self._probe_dir(sensor_type, probe), month.strftime('%Y-%m') + suffix + '.npy')
+
+    def _month_paths(self, sensor_type: str, probe: Optional[str], month: datetime) -> List[str]:
+        """Every device's file for one probe and month"""
+        probe_dir = self._probe_dir(sensor_type, probe)
+        prefix = month.strftime('%Y-%m')
+        try:
+            names = os.listdir(probe_dir)
+        except OSError:
+            return []
+        return sorted(os.path.join(probe_dir, name) for name in names
+                      if name.endswith('.npy') and (name == prefix + '.npy' or name.startswith(prefix + '@')))
+
+    @staticmethod
+    def _parse_name(name: str) -> Optional[Tuple[datetime, Optional[str]]]:
+        """'2024-05.npy' -> (month, None); '2024-05@dev1.npy' -> (month, 'dev1')"""
+        if not name.endswith('.npy'):
+            return None
+        stem, _, device = name[:-4].partition('@')
+        try:
+            return datetime.strptime(stem, '%Y-%m'), unquote(device) if device else None
+        except ValueError:
+            return None
+
+    def _write(self, path: str, data: np.ndarray):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp_path, path)  # readers see the old or new file, never half of one
+
+    # =============================
+    # WRITE
+    # =============================
+    def append(self, sensor_type: str, probe: Optional[str], rows: Iterable[Tuple[datetime, float]],
+               device: Optional[str] = None) -> int:
+        """
+        Merge (timestamp, value) rows into their month files. Re-archiving the same
+        rows (e.g. after a crash before the DB delete) is harmless - duplicate
+        timestamps keep one copy. Returns rows written.
+        """
+        by_month: Dict[datetime, List[Tuple[datetime, float]]] = {}
+        for ts, value in rows:
+            by_month.setdefault(month_start(ts), []).append((ts, value))
+
+        written = 0
+        for month, month_rows in by_month.items():
+            new = np.empty(len(month_rows), dtype=ARCHIVE_DTYPE)
+            new['t'] = [int((ts - month).total_seconds()) for ts, _ in month_rows]
+            new['v'] = [value for _, value in month_rows]
+
+            path = self.path(sensor_type, probe, month, device)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                new = np.concatenate((np.load(path).astype(ARCHIVE_DTYPE), new))  # older files: float32 values
+            # Sort by time and drop duplicate timestamps in one pass
+            _, keep = np.unique(new['t'], return_index=True)
+            self._write(path, new[keep])
+            written += len(month_rows)
+        return written
+
+    # =============================
+    # READ
+    # =============================
+    def _open(self, path: str) -> Optional[np.ndarray]:
+        """Memory-mapped month file, reopened only when the file is replaced"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached and cached[0] == key:
+                return cached[1]
+        data = np.load(path, mmap_mode='r')
+        with self._lock:
+            self._maps[path] = (key, data)
+        return data
+
+    def read(self, sensor_type: str, probe: Optional[str], start: datetime, end: datetime
+             ) -> Tuple[np.ndarray, np.ndarray]:
+        """(timestamps as datetime64[s] UTC, values float64) for [start, end), oldest first"""
+        times, values = [], []
+        month = month_start(start)
+        while month < end:
+            month_t, month_v = [], []
+            for path in self._month_paths(sensor_type, probe, month):
+                data = self._open(path)
+                if data is None or not len(data):
+                    continue
+                lo_sec = max((start - month).total_seconds(), 0)
+                hi_sec = (end - month).total_seconds()
+                # Binary search on the mapped time column - only touched pages are read
+                lo, hi = np.searchsorted(data['t'], [lo_sec, hi_sec], side='left')
+                if hi > lo:
+                    month_t.append(np.asarray(data['t'][lo:hi]))
+                    month_v.append(np.asarray(data['v'][lo:hi], dtype=np.float64))
+            if month_t:
+                t, v = np.concatenate(month_t), np.concatenate(month_v)
+                if len(month_t) > 1:  # several devices for one probe - interleave by time
+                    order = np.argsort(t, kind='stable')
+                    t, v = t[order], v[order]
+                times.append(np.datetime64(month, 's') + t.astype('timedelta64[s]'))
+                values.append(v)
+            month = _next_month(month)
+
+        if not times:
+            return np.array([], dtype='datetime64[s]'), np.array([], dtype=np.float64)
+        return np.concatenate(times), np.concatenate(values)
+
+    def files(self) -> Iterable[Tuple[datetime, str, Optional[str], str]]:
+        """(month, sensor_type, probe, path) for every archive file (any device), oldest month first - real names, decoded"""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for type_name in os.listdir(self.root):
+            type_dir = os.path.join(self.root, type_name)
+            if not os.path.isdir(type_dir):
+                continue
+            sensor_type = unquote(type_name)
+            for probe_dir in os.listdir(type_dir):
+                probe = None if probe_dir == _NULL_PROBE else unquote(probe_dir)
+                for name in os.listdir(os.path.join(type_dir, probe_dir)):
+                    parsed = self._parse_name(name)
+                    if parsed is None:
+                        continue
+                    found.append((parsed[0], sensor_type, probe, os.path.join(type_dir, probe_dir, name)))
+        return sorted(found, key=lambda f: (f[0], f[1], f[2] or '', f[3]))
+
+    def iter_rows(self, sensor_type: Optional[str] = None, probes: Optional[List[str]] = None,
+                  start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  chunk_rows: int = 2000) -> Iterable[list]:
+        """
+        Archived readings as chunks of (None, timestamp, sensor_type, probe, value) rows -
+        the export row shape, with no id - in time order, one month in memory at a time.
+        """
+        wanted = set(probes) if probes else None
+        by_month: Dict[datetime, list] = {}
+        for month, file_type, probe, path in self.files():
+            if sensor_type and file_type != sensor_type:
+                continue
+            if wanted is not None and probe not in wanted:
+                continue
+            if (end and month >= end) or (start and _next_month(month) <= start):
+                continue
+            by_month.setdefault(month, []).append((file_type, probe, path))
+
+        for month in sorted(by_month):
+            t_parts, v_parts, keys = [], [], []
+            for index, (file_type, probe, path) in enumerate(by_month[month]):
+                data = self._open(path)
+                if data is None:
+                    continue
+                lo_sec = max((start - month).total_seconds(), 0) if start else 0
+                hi_sec = (end - month).total_seconds() if end else np.inf
+                lo, hi = np.searchsorted(data['t'], [lo_sec, hi_sec], side='left')
+                t_parts.append(np.asarray(data['t'][lo:hi]))
+                v_parts.append(np.asarray(data['v'][lo:hi], dtype=np.float64))
+                keys.append(np.full(hi - lo, index))
+            if not t_parts:
+                continue
+            t = np.concatenate(t_parts)
+            order = np.argsort(t, kind='stable')
+            t, v, k = t[order], np.concatenate(v_parts)[order], np.concatenate(keys)[order]
+            meta = by_month[month]
+            base = np.datetime64(month, 's')
+            for i in range(0, len(t), chunk_rows):
+                stamps = (base + t[i:i + chunk_rows].astype('timedelta64[s]')).astype(datetime)
+                yield [(None, ts, meta[key][0], meta[key][1], float(value))
+                       for ts, key, value in zip(stamps, k[i:i + chunk_rows], v[i:i + chunk_rows])]
+
+    # =============================
+    # RETENTION
+    # =============================
+    def prune(self, before: datetime, dry_run: bool = False) -> int:
+        """Drop archived readings older than `before`: whole month files, or the head of one. Returns rows removed."""
+        removed = 0
+        for month, _, _, path in self.files():
+            if month >= before:
+                continue
+            data = np.load(path)
+            if _next_month(month) <= before:
+                keep = data[:0]
+            else:
+                keep = data[np.searchsorted(data['t'], (before - month).total_seconds(), side='left'):]
+            if len(keep) == len(data):
+                continue
+            removed += len(data) - len(keep)
+            if dry_run:
+                continue
+            if len(keep):
+                self._write(path, keep)
+            else:
+                os.unlink(path)
+            with self._lock:
+                self._maps.pop(path, None)
+        if removed and not dry_run:
+            logger.info(f"Archive: pruned {removed} readings older than {before:%Y-%m-%d %H:%M}")
+        return removed
+
+    def size_bytes(self) -> int:
+        total = 0
+        for dirpath, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files if f.endswith('.npy'))
+        return total
+
+
+archive = ColumnarArchive()
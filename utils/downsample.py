@@ -0,0 +1,62 @@
+import numpy as np
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    x, y: 1-D arrays (x ascending, e.g. epoch seconds). Returns indices of the
+    n_out points kept - first and last always included. Each bucket's triangle
+    areas are computed as one vectorized NumPy expression; only the walk from
+    bucket to bucket (which depends on the previous pick) is a Python loop.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket edges for the n - 2 interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Average point of every bucket, all at once, via cumulative sums
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.maximum(ends - starts, 1)
+    avg_x = (cx[ends] - cx[starts]) / counts
+    avg_y = (cy[ends] - cy[starts]) / counts
+    # The bucket after the last one is the final point itself
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = starts[i], max(ends[i], starts[i] + 1)
+        ax, ay = x[a], y[a]
+        # Twice the triangle area (a, candidate, next bucket average) for every candidate
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def minmax(x, y, n_out):
+    """
+    Min/max bucketing: keeps the lowest and highest point of each of n_out // 2
+    buckets (spikes are never lost). Fully vectorized. Returns sorted indices.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    bucket_id = (np.arange(n) * buckets) // n
+    # Order by (bucket, value): first of each bucket is its min, last is its max
+    order = np.lexsort((y, bucket_id))
+    sorted_buckets = bucket_id[order]
+    first = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.concatenate((order[first], order[last])))
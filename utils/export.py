@@ -0,0 +1,107 @@
+# utils/export.py
+"""
+Streaming export of sensor_readings as CSV or NDJSON, shared by /api/export
+and scripts/sys_scripts/export_readings.py.
+
+Rows come from the columnar archive (oldest) and then a server-side cursor
+(stream_results + yield_per), are encoded a chunk at a time and optionally
+gzip-compressed on the fly, so memory stays flat whatever the size of the export.
+"""
+import csv
+import io
+import itertools
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+from sqlalchemy import select
+from models.sensor_data import SensorReading
+from utils.archive import archive
+
+EXPORT_CHUNK_ROWS = 2000  # rows fetched per round trip and encoded per yielded chunk
+
+COLUMNS = ('id', 'timestamp', 'sensor_type', 'probe_id', 'value')
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def export_query(sensor_type: Optional[str] = None, probes: Optional[List[str]] = None,
+                 start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """SELECT for readings matching the filters, in time order ([start, end), naive UTC)"""
+    stmt = select(SensorReading.id, SensorReading.timestamp, SensorReading.sensor_type,
+                  SensorReading.probe_id, SensorReading.value)
+    if sensor_type:
+        stmt = stmt.where(SensorReading.sensor_type == sensor_type)
+    if probes:
+        stmt = stmt.where(SensorReading.probe_id.in_(probes))
+    if start:
+        stmt = stmt.where(SensorReading.timestamp >= start)
+    if end:
+        stmt = stmt.where(SensorReading.timestamp < end)
+    return stmt.order_by(SensorReading.timestamp, SensorReading.id)
+
+
+def stream_rows(conn, stmt, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[list]:
+    """
+    Yield lists of up to chunk_rows rows from a server-side cursor
+    (a named cursor on Postgres; SQLite steps its cursor lazily anyway).
+    """
+    result = conn.execute(stmt.execution_options(stream_results=True, yield_per=chunk_rows))
+    try:
+        for chunk in result.partitions(chunk_rows):
+            yield chunk
+    finally:
+        result.close()
+
+
+def _timestamp(ts):
+    return ts.strftime("%Y-%m-%dT%H:%M:%SZ") if ts else None
+
+
+def encode(chunks: Iterable[list], fmt: str) -> Iterator[bytes]:
+    """Encode row chunks as CSV (with header) or NDJSON - one bytes block per chunk"""
+    if fmt == 'csv':
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(COLUMNS)
+        for chunk in chunks:
+            writer.writerows((r[0], _timestamp(r[1]), r[2], r[3], r[4]) for r in chunk)
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode('utf-8')  # header only - no rows matched
+    elif fmt == 'ndjson':
+        for chunk in chunks:
+            yield ''.join(
+                json.dumps(dict(zip(COLUMNS, (r[0], _timestamp(r[1]), r[2], r[3], r[4])))) + '\n'
+                for r in chunk
+            ).encode('utf-8')
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def gzip_stream(blocks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream on the fly into a single gzip member (wbits=31 -> gzip header)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for block in blocks:
+        out = compressor.compress(block)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def export_stream(conn, fmt: str = 'csv', compress: bool = False, chunk_rows: int = EXPORT_CHUNK_ROWS,
+                  include_archive: bool = True, **filters) -> Iterator[bytes]:
+    """
+    Full pipeline: archived rows (older, no id) then the server-side cursor
+    over sensor_readings -> CSV/NDJSON -> optional gzip
+    """
+    chunks = stream_rows(conn, export_query(**filters), chunk_rows)
+    if include_archive:
+        chunks = itertools.chain(archive.iter_rows(chunk_rows=chunk_rows, **filters), chunks)
+    blocks = encode(chunks, fmt)
+    return gzip_stream(blocks) if compress else blocks
@@ -0,0 +1,85 @@
+# utils/ingest.py
+"""
+Bulk insert path for sensor readings, shared by the sensor loop and import tools.
+
+A whole cycle (or a backfill chunk) goes in as one executemany INSERT, which
+SQLAlchemy sends as multi-row VALUES batches. No ORM objects, no unit of work.
+On Postgres with psycopg2, batches of INGEST_COPY_MIN_ROWS or more use COPY.
+Nothing here commits; the caller owns the transaction.
+"""
+import csv
+import io
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import insert
+from models.sensor_data import SensorReading
+
+# COPY only pays off once the batch is big enough to amortise its setup
+INGEST_COPY_MIN_ROWS = int(os.getenv('INGEST_COPY_MIN_ROWS', '1000'))
+
+COLUMNS = ('timestamp', 'sensor_type', 'probe_id', 'value', 'device_id')
+
+METHODS = ('auto', 'executemany', 'copy')
+
+
+def reading_row(sensor_type: str, probe_id: Optional[str], value: float,
+                timestamp: Optional[datetime] = None, device_id: Optional[str] = None) -> Dict:
+    """One row in the shape insert_readings() takes"""
+    return {
+        'timestamp': timestamp or datetime.utcnow(),
+        'sensor_type': sensor_type,
+        'probe_id': probe_id,
+        'value': value,
+        'device_id': device_id,
+    }
+
+
+def _is_session(conn) -> bool:
+    return hasattr(conn, 'get_bind')  # Session or scoped_session (db.session)
+
+
+def _copy_supported(conn) -> bool:
+    bind = conn.get_bind() if _is_session(conn) else conn
+    return bind.dialect.name == 'postgresql' and bind.dialect.driver == 'psycopg2'
+
+
+def _copy(conn, rows: List[Dict]):
+    """COPY ... FROM STDIN (CSV) on the caller's connection and transaction"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        ts = row.get('timestamp')
+        writer.writerow((ts.isoformat(sep=' ') if ts else None, row.get('sensor_type'),
+                         row.get('probe_id'), row.get('value'), row.get('device_id')))
+    buf.seek(0)
+
+    connection = conn.connection() if _is_session(conn) else conn
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {SensorReading.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+
+
+def insert_readings(conn, rows: Iterable[Dict], method: str = 'auto') -> int:
+    """
+    Insert reading dicts (see reading_row()) through a Session or Connection.
+    method: 'executemany', 'copy' (Postgres + psycopg2 only), or 'auto' (COPY
+    for big batches where supported). Returns rows written; does not commit.
+    """
+    rows = [{column: row.get(column) for column in COLUMNS} for row in rows]
+    if not rows:
+        return 0
+    if method not in METHODS:
+        raise ValueError(f"Unknown ingest method: {method}")
+
+    use_copy = method == 'copy' or (method == 'auto' and len(rows) >= INGEST_COPY_MIN_ROWS)
+    if use_copy and _copy_supported(conn):
+        _copy(conn, rows)
+    elif method == 'copy':
+        raise ValueError("COPY needs PostgreSQL with psycopg2")
+    else:
+        conn.execute(insert(SensorReading.__table__), rows)
+    return len(rows)
@@ -0,0 +1,88 @@
+# utils/latest_store.py
+"""
+Latest-value store shared by the sensor loop and every gunicorn worker.
+
+The loop (one process) publishes a small JSON snapshot after each committed
+cycle; routes in any worker read it. The file lives in /dev/shm (RAM-backed
+shared memory) and is replaced atomically, and readers only re-parse it when
+its stat() changes - so a read costs one stat() and no DB query.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from utils.logger import get_logger
+
+logger = get_logger("app")
+
+_SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+LATEST_STORE_PATH = os.getenv('LATEST_STORE_PATH', os.path.join(_SHM_DIR, 'smart_allotment_latest.json'))
+
+# Older than this and the collector is treated as down (sensors show Offline)
+STALE_AFTER_SECS = 3 * int(os.getenv('INTERVAL', '60'))
+
+
+class LatestStore:
+    """Atomic-replace JSON file with a stat()-keyed read cache per process."""
+
+    def __init__(self, path: str = LATEST_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cache_key = None
+        self._cache: Optional[Dict] = None
+        self._seq = 0
+
+    def publish(self, readings: Dict[str, Dict[str, float]], **extra) -> Dict:
+        """
+        Write a new snapshot: {seq, time, published, readings: {sensor_type: {probe: value}}, **extra}.
+        Called by the sensor loop after its commit.
+        """
+        self._seq += 1
+        snapshot = {
+            'seq': self._seq,
+            'pid': os.getpid(),
+            'time': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+            'published': time.time(),
+            'readings': readings,
+        }
+        snapshot.update(extra)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)  # readers see old or new file, never half of one
+        except OSError as e:
+            logger.error(f"Latest store publish failed ({self.path}): {e}")
+        return snapshot
+
+    def read(self) -> Optional[Dict]:
+        """Latest snapshot, or None if the collector has never published"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if key == self._cache_key:
+                return self._cache
+        try:
+            with open(self.path, 'r') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Latest store unreadable ({self.path}): {e}")
+            return None
+        with self._lock:
+            self._cache_key, self._cache = key, snapshot
+        return snapshot
+
+    @staticmethod
+    def is_fresh(snapshot: Optional[Dict]) -> bool:
+        return bool(snapshot) and time.time() - snapshot.get('published', 0) <= STALE_AFTER_SECS
+
+
+latest_store = LatestStore()
@@ -0,0 +1,178 @@
+# utils/mailer.py
+"""
+Background email dispatcher: one worker thread, one reused authenticated SMTP
+connection, retries with exponential backoff. send() only enqueues, so the
+sensor loop never waits on the mail server.
+
+Point it at a local stand-in for test runs, e.g.
+    python -m aiosmtpd -n -l localhost:8025
+    SMTP_HOST=localhost SMTP_PORT=8025 SMTP_STARTTLS=0
+"""
+import atexit
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from utils.logger import get_logger
+
+load_dotenv()
+
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') != '0'
+SMTP_USER = os.getenv('SMTP_USER')
+SMTP_PASS = os.getenv('SMTP_PASS')
+SMTP_MAX_RETRIES = int(os.getenv('SMTP_MAX_RETRIES', '5'))
+SMTP_RETRY_BASE_SECS = float(os.getenv('SMTP_RETRY_BASE_SECS', '2'))
+SMTP_IDLE_SECS = float(os.getenv('SMTP_IDLE_SECS', '60'))  # close the connection after this long idle
+SMTP_TIMEOUT_SECS = float(os.getenv('SMTP_TIMEOUT_SECS', '30'))
+
+## Setup Logging
+logger = get_logger("notifications")
+
+
+class MailDispatcher:
+    """Queue + worker thread that owns a single pooled SMTP connection."""
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, user=SMTP_USER, password=SMTP_PASS,
+                 starttls=SMTP_STARTTLS, max_retries=SMTP_MAX_RETRIES,
+                 retry_base_secs=SMTP_RETRY_BASE_SECS, idle_secs=SMTP_IDLE_SECS):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.max_retries = max_retries
+        self.retry_base_secs = retry_base_secs
+        self.idle_secs = idle_secs
+
+        self._queue: "queue.Queue[EmailMessage]" = queue.Queue()
+        self._conn: Optional[smtplib.SMTP] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats = {'sent': 0, 'failed': 0, 'retries': 0, 'connects': 0,
+                       'last_latency_ms': None, 'total_latency_ms': 0.0}
+
+    # =============================
+    # PUBLIC API
+    # =============================
+    def send(self, msg: EmailMessage):
+        """Queue a message for delivery - never blocks on the network"""
+        self._ensure_started()
+        self._queue.put(msg)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until the queue is drained (scripts call this before exiting)"""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stats(self) -> Dict:
+        """Queue depth, send latency and failure counts"""
+        stats = dict(self._stats)
+        sent = stats.pop('total_latency_ms')
+        stats['avg_latency_ms'] = round(sent / stats['sent'], 1) if stats['sent'] else None
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    # =============================
+    # WORKER
+    # =============================
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mail-dispatcher", daemon=True)
+                self._thread.start()
+
+    def _connection(self) -> smtplib.SMTP:
+        """Reuse the open connection if the server still answers NOOP, else reconnect"""
+        if self._conn is not None:
+            try:
+                if self._conn.noop()[0] == 250:
+                    return self._conn
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close()
+
+        conn = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECS)
+        try:
+            if self.starttls:
+                conn.starttls()
+            if self.user:
+                conn.login(self.user, self.password)
+        except Exception:
+            conn.close()
+            raise
+        self._conn = conn
+        self._stats['connects'] += 1
+        logger.info(f"SMTP connection opened to {self.host}:{self.port}")
+        return conn
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _deliver(self, msg: EmailMessage):
+        subject = msg['Subject']
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                self._connection().send_message(msg)
+                latency_ms = (time.monotonic() - started) * 1000
+                self._stats['sent'] += 1
+                self._stats['last_latency_ms'] = round(latency_ms, 1)
+                self._stats['total_latency_ms'] += latency_ms
+                logger.info(f"✅ Email sent successfully: {subject} ({latency_ms:.0f}ms)")
+                return
+            except smtplib.SMTPAuthenticationError:
+                # Retrying won't fix bad credentials
+                logger.error("❌ Email FAILED - Invalid Gmail credentials")
+                self._close()
+                break
+            except smtplib.SMTPServerDisconnected:
+                logger.error("❌ Email FAILED - Server disconnected (network issue)")
+            except Exception as e:
+                logger.error(f"❌ Email FAILED - {str(e)}")
+
+            self._close()
+            if attempt < self.max_retries:
+                delay = self.retry_base_secs * (2 ** attempt)
+                self._stats['retries'] += 1
+                logger.info(f"Retrying '{subject}' in {delay:.0f}s (attempt {attempt + 2}/{self.max_retries + 1})")
+                time.sleep(delay)
+
+        self._stats['failed'] += 1
+        logger.error(f"❌ Email dropped after {self.max_retries + 1} attempts: {subject}")
+
+    def _run(self):
+        while True:
+            try:
+                msg = self._queue.get(timeout=self.idle_secs)
+            except queue.Empty:
+                self._close()  # don't hold an idle connection open
+                continue
+            try:
+                self._deliver(msg)
+            finally:
+                self._queue.task_done()
+
+
+dispatcher = MailDispatcher()
+
+# Deliver anything still queued when a short-lived script (e.g. monitor_system) exits
+atexit.register(dispatcher.flush)
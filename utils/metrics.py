@@ -0,0 +1,270 @@
+# utils/metrics.py
+"""
+Process-local metrics exposed at /metrics in Prometheus text format.
+
+Each process (the sensor loop's worker and every gunicorn worker) keeps its
+counters, gauges and histograms in memory and writes them to its own file,
+METRICS_DIR/<pid>.json, at most every METRICS_FLUSH_SECS as requests end
+(and after every sensor cycle) - never from inside a SQL statement.
+Whichever worker serves /metrics merges all live files, so the scrape shows
+the whole app however requests are spread over workers.
+Counters and histograms are summed across processes; so are gauges, which
+are only ever set by the one process that owns them (e.g. the mail queue
+lives in the sensor loop's process). Files of dead pids are dropped, so a
+restarted worker's counters start again from zero - Prometheus treats that
+as a counter reset.
+"""
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+from sqlalchemy import event
+from utils.logger import get_logger
+
+logger = get_logger("app")
+
+_SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(_SHM_DIR, 'smart_allotment_metrics'))
+METRICS_FLUSH_SECS = float(os.getenv('METRICS_FLUSH_SECS', '10'))
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# name -> (type, help, histogram buckets). Anything recorded must be declared here.
+METRICS = {
+    'sensor_cycles_total': ('counter', "Sensor cycles completed", None),
+    'sensor_cycle_errors_total': ('counter', "Sensor cycles that failed and were rolled back", None),
+    'sensor_cycle_seconds': ('histogram', "Wall time of a whole sensor cycle", SECONDS_BUCKETS),
+    'sensor_cycle_phase_seconds': ('histogram', "Sensor cycle time by phase", SECONDS_BUCKETS),
+    'sensor_cycle_readings': ('gauge', "Readings saved by the last cycle", None),
+    'sensor_cycle_queries': ('gauge', "SQL statements run by the last cycle", None),
+    'sensor_last_cycle_timestamp_seconds': ('gauge', "Unix time the last cycle finished", None),
+    'sensor_acquire_bus_seconds': ('histogram', "Time to read every probe on one bus", SECONDS_BUCKETS),
+    'sensor_bus_skipped_total': ('counter', "Cycles a bus was skipped because its last read still hung", None),
+    'sensor_probe_read_seconds': ('summary', "Per-probe read latency", None),
+    'sensor_probe_failures_total': ('counter', "Probe reads that gave no value (reason=error|timeout)", None),
+    'db_queries_total': ('counter', "SQL statements executed", None),
+    'mail_queue_depth': ('gauge', "Emails waiting in the dispatcher queue", None),
+    'mail_sent_total': ('counter', "Emails delivered", None),
+    'mail_failed_total': ('counter', "Emails dropped after all retries", None),
+    'mail_retries_total': ('counter', "SMTP delivery retries", None),
+    'http_request_seconds': ('histogram', "Request latency by endpoint (PROFILER_ENABLED)", SECONDS_BUCKETS),
+    'http_request_queries': ('summary', "SQL statements per request by endpoint (PROFILER_ENABLED)", None),
+    'http_request_sql_seconds': ('summary', "Time in SQL per request by endpoint (PROFILER_ENABLED)", None),
+    'http_slow_requests_total': ('counter', "Requests slower than PROFILER_SLOW_MS", None),
+    'http_n_plus_one_total': ('counter', "Requests that repeated one query pattern PROFILER_N_PLUS_ONE+ times", None),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """In-memory metric values for this process, plus the per-pid file they are shared through."""
+
+    def __init__(self, directory: str = METRICS_DIR, flush_secs: float = METRICS_FLUSH_SECS,
+                 enabled: bool = METRICS_ENABLED):
+        self.directory = directory
+        self.enabled = enabled
+        self.flush_secs = flush_secs
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Labels], float] = {}          # counters and gauges
+        self._hists: Dict[Tuple[str, Labels], List[float]] = {}     # [bucket counts..., sum, count]
+        self._last_flush = 0.0
+        self._local = threading.local()
+        self._sections: Dict[str, Callable[[], Dict]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> Tuple[str, Labels]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    # =============================
+    # RECORD
+    # =============================
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Histogram observation, or sum/count only for summaries"""
+        buckets = METRICS[name][2] or ()
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._hists.get(key)
+            if hist is None:
+                hist = self._hists[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    # =============================
+    # DB QUERY COUNTING
+    # =============================
+    def instrument_engine(self, engine):
+        """Count every statement `engine` executes (once per engine)"""
+        if not event.contains(engine, 'before_cursor_execute', self._count_query):
+            event.listen(engine, 'before_cursor_execute', self._count_query)
+
+    def _count_query(self, *_):
+        # Runs mid-statement with the connection checked out - count only, never flush here
+        self._local.queries = getattr(self._local, 'queries', 0) + 1
+        self.inc('db_queries_total')
+
+    def init_app(self, app, engine):
+        """Count `engine`'s statements and flush (at most every flush_secs) as each request ends"""
+        self.instrument_engine(engine)
+        app.teardown_request(self._teardown_request)
+
+    def _teardown_request(self, exc=None):
+        self.maybe_flush()
+
+    def thread_queries(self) -> int:
+        """Statements run so far on this thread - diff two calls to count a unit of work"""
+        return getattr(self._local, 'queries', 0)
+
+    # =============================
+    # SHARE ACROSS PROCESSES
+    # =============================
+    def _collect(self):
+        """Pull values owned by other modules (only if this process loaded them)"""
+        mailer = sys.modules.get('utils.mailer')
+        if mailer is not None:
+            stats = mailer.dispatcher.stats()
+            self.set('mail_queue_depth', stats['queue_depth'])
+            self.set('mail_sent_total', stats['sent'])
+            self.set('mail_failed_total', stats['failed'])
+            self.set('mail_retries_total', stats['retries'])
+
+    def add_section(self, name: str, fn: Callable[[], Dict]):
+        """Share extra JSON-able state through the per-pid files (read back with sections())"""
+        self._sections[name] = fn
+
+    def snapshot(self) -> Dict:
+        self._collect()
+        sections = {name: fn() for name, fn in self._sections.items()}
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'values': [[name, dict(labels), value] for (name, labels), value in self._values.items()],
+                'hists': [[name, dict(labels), hist] for (name, labels), hist in self._hists.items()],
+                'sections': sections,
+            }
+
+    def sections(self, name: str) -> List[Dict]:
+        """One process's `name` section per live process"""
+        return [snap['sections'][name] for snap in self._snapshots() if name in snap.get('sections', {})]
+
+    def flush(self):
+        """Write this process's values to METRICS_DIR/<pid>.json (atomic replace)"""
+        self._last_flush = time.monotonic()
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{os.getpid()}.json")
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Metrics flush failed: {e}")
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_secs:
+            self.flush()
+
+    def _snapshots(self) -> Iterable[Dict]:
+        """This process live, plus every other live process's last flush"""
+        yield self.snapshot()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                pid = int(name[:-5])
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                try:
+                    os.unlink(path)  # worker is gone - its counters go with it
+                except OSError:
+                    pass
+                continue
+            except PermissionError:
+                pass  # alive, owned by another user
+            try:
+                with open(path) as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    # =============================
+    # PROMETHEUS TEXT FORMAT
+    # =============================
+    def render(self) -> str:
+        values: Dict[Tuple[str, Labels], float] = {}
+        hists: Dict[Tuple[str, Labels], List[float]] = {}
+        for snap in self._snapshots():
+            for name, labels, value in snap['values']:
+                key = self._key(name, labels)
+                values[key] = values.get(key, 0) + value
+            for name, labels, hist in snap['hists']:
+                key = self._key(name, labels)
+                merged = hists.get(key)
+                hists[key] = hist if merged is None else [a + b for a, b in zip(merged, hist)]
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            series = sorted((k, v) for k, v in values.items() if k[0] == name)
+            series_h = sorted((k, v) for k, v in hists.items() if k[0] == name)
+            if not series and not series_h:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (_, labels), value in series:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+            for (_, labels), hist in series_h:
+                for bound, count in zip(buckets or (), hist):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {count}")
+                if buckets:
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {hist[-1]}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(hist[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {hist[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and not math.isfinite(value):
+        return 'NaN' if math.isnan(value) else ('+Inf' if value > 0 else '-Inf')
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+metrics = MetricsRegistry()
@@ -1,14 +1,16 @@
 # utils/notifications.py
 from utils.logger import get_logger
+import atexit
 import logging
 import os
 from datetime import datetime, timedelta
-import smtplib
+import threading
 from email.message import EmailMessage
 from dotenv import load_dotenv
 from flask import current_app
 from app.extensions import db
 from models.alerts import Alert
+from utils.mailer import dispatcher
 
 load_dotenv()
 
@@ -28,10 +30,59 @@ ALERT_TYPES = {
     'low_light': 'Low Light'
 }
 
+# Hours between repeat emails, per alert type.
+# ALERT_COOLDOWN_HOURS sets the default; ALERT_COOLDOWN_HOURS_<KEY> overrides one type,
+# e.g. ALERT_COOLDOWN_HOURS_LOW_TEMP=1 for frost warnings every hour.
+DEFAULT_COOLDOWN_HOURS = float(os.getenv('ALERT_COOLDOWN_HOURS', '4'))
+COOLDOWN_HOURS = {
+    key: float(os.getenv(f'ALERT_COOLDOWN_HOURS_{key.upper()}', DEFAULT_COOLDOWN_HOURS))
+    for key in ALERT_TYPES
+}
+
+
+class CooldownIndex:
+    """
+    In-process index of the newest last_notified per (sensor_name, Alert.alert_type).
+    Filled from the DB once, then kept current write-through by mark_alert_sent()
+    and AlertEngine.notify(), so cooldown checks never query.
+    """
+
+    def __init__(self):
+        self._last_notified = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        """Fill from the alerts table (needs an app context)"""
+        with current_app.app_context():
+            rows = db.session.query(
+                Alert.sensor_name, Alert.alert_type, db.func.max(Alert.last_notified)
+            ).filter(Alert.last_notified.isnot(None)).group_by(
+                Alert.sensor_name, Alert.alert_type
+            ).all()
+        with self._lock:
+            self._last_notified = {(sensor, alert_type): ts for sensor, alert_type, ts in rows}
+            self.loaded = True
+        logger.info(f"Cooldown index loaded: {len(rows)} sensor/alert pairs")
+
+    def get(self, sensor_name, real_type):
+        if not self.loaded:
+            self.load()
+        return self._last_notified.get((sensor_name, real_type))
+
+    def record(self, sensor_name, real_type, when):
+        with self._lock:
+            self._last_notified[(sensor_name, real_type)] = when
+
+
+cooldowns = CooldownIndex()
+
 
 def send_email_alert(subject, body, to_email=None, admin=False):
     """
-    Send an email alert.
+    Queue an email alert on the background dispatcher (utils/mailer.py).
+    Returns as soon as it is queued - delivery, retries and failures are
+    handled and logged by the dispatcher thread.
     """
     msg = EmailMessage()
     msg.set_content(body)
@@ -41,79 +92,143 @@ def send_email_alert(subject, body, to_email=None, admin=False):
     recipient = ADMIN_EMAIL if admin else to_email
     msg['To'] = recipient
 
-    # SMTP Settings
-    try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.send_message(msg)
-        logger.info(f"✅ Email sent successfully: {subject}")
-        return True
-    
-    except smtplib.SMTPAuthenticationError:
-        logger.error("❌ Email FAILED - Invalid Gmail credentials")
-        return False
-    except smtplib.SMTPServerDisconnected:
-        logger.error("❌ Email FAILED - Server disconnected (network issue)")
-        return False
-    except Exception as e:
-        logger.error(f"❌ Email FAILED - {str(e)}")
-        return False
-
-def alert_low_moisture(sensor_name, value):
+    dispatcher.send(msg)
+    logger.info(f"📨 Email queued: {subject} (queue depth {dispatcher.stats()['queue_depth']})")
+    return True
+
+# =============================
+# ALERT DIGEST
+# =============================
+# Holds alert emails for ALERT_DIGEST_SECS and sends one summary per recipient,
+# so a frost night that trips every Temp-* probe sends one email, not twenty.
+# Off by default (ALERT_DIGEST_SECS=0): every alert email goes out straight away.
+# ALERT_DIGEST_BYPASS lists alert types that are never held back, first alert or
+# repeat, e.g. ALERT_DIGEST_BYPASS=low_temp,high_temp
+ALERT_DIGEST_SECS = float(os.getenv('ALERT_DIGEST_SECS', '0'))
+ALERT_DIGEST_BYPASS = {t.strip() for t in os.getenv('ALERT_DIGEST_BYPASS', '').split(',') if t.strip()}
+
+
+class AlertDigest:
+    """Collects alert emails per recipient for a short window, then flushes them as one."""
+
+    def __init__(self, window_secs=ALERT_DIGEST_SECS):
+        self.window_secs = window_secs
+        self._pending = {}  # {recipient: [(alert_type, sensor_name, subject, body)]}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, recipient, alert_type, sensor_name, subject, body):
+        with self._lock:
+            self._pending.setdefault(recipient, []).append((alert_type, sensor_name, subject, body))
+            if self._timer is None:
+                # Window opens with the first alert and closes window_secs later
+                self._timer = threading.Timer(self.window_secs, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Send everything collected so far (timer callback; also run at exit)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        for recipient, items in pending.items():
+            if len(items) == 1:
+                _, _, subject, body = items[0]
+                send_email_alert(subject, body, recipient)
+                continue
+
+            # Group by alert type, then sensor
+            by_type = {}
+            for alert_type, sensor_name, _, body in items:
+                by_type.setdefault(ALERT_TYPES.get(alert_type, alert_type), []).append((sensor_name, body))
+
+            summary = ", ".join(f"{len(entries)} {real_type}" for real_type, entries in sorted(by_type.items()))
+            subject = f"Alert digest: {len(items)} alerts ({summary})"
+            lines = []
+            for real_type, entries in sorted(by_type.items()):
+                lines.append(f"{real_type} ({len(entries)}):")
+                lines.extend(f"  - {sensor_name}: {body}" for sensor_name, body in sorted(entries))
+                lines.append("")
+
+            send_email_alert(subject, "\n".join(lines).rstrip() + "\n", recipient)
+            logger.info(f"Digest sent to {recipient}: {len(items)} alerts")
+
+
+digest = AlertDigest()
+atexit.register(digest.flush)  # runs before the dispatcher's own atexit flush
+
+
+def queue_alert_email(alert_type, sensor_name, subject, body, first=False):
+    """Send an alert email via the digest, or directly if the digest is off / bypassed for this type."""
+    if ALERT_DIGEST_SECS <= 0 or alert_type in ALERT_DIGEST_BYPASS:
+        send_email_alert(subject, body, TO_EMAIL)
+    else:
+        digest.add(TO_EMAIL, alert_type, sensor_name, subject, body)
+
+# The alert_* senders check the cooldown and stamp last_notified themselves
+# (own commit). With mark=False they only send: AlertEngine has already made
+# the cooldown decision and staged the stamp in the sensor cycle's commit.
+
+def alert_low_moisture(sensor_name, value, first=False, mark=True):
     """
     Alert for low soil moisture.
     """
-    if not should_send_alert(sensor_name, 'low_soil_moisture'):
+    if mark and not should_send_alert(sensor_name, 'low_soil_moisture'):
         logger.info(f"Low Soil Moisture Alert Skipped (cooldown active): {value}%")
         return
 
     subject = f"Alert: Low Moisture ({sensor_name})"
     body = f"Soil moisture is low: {value}%"
         
-    # Send email
-    send_email_alert(subject, body, TO_EMAIL)
+    # Send email (or hold it for the digest)
+    queue_alert_email('low_soil_moisture', sensor_name, subject, body, first)
 
     # Update alerts.json and mark as 'sent'
-    mark_alert_sent(sensor_name, 'low_soil_moisture') 
+    if mark:
+        mark_alert_sent(sensor_name, 'low_soil_moisture')
 
-def alert_high_temperature(sensor_name, value):
+def alert_high_temperature(sensor_name, value, first=False, mark=True):
     """
     Alert for high temperature.
     """
 
-    if not should_send_alert(sensor_name, 'high_temp'):
+    if mark and not should_send_alert(sensor_name, 'high_temp'):
         logger.info(f"High Temp Alert Skipped (cooldown active): {value}°C")
         return
 
     subject = f"Alert: High Temperature ({sensor_name})"
     body = f"Temperature is high: {value}°C"
     
-    # Send email
-    send_email_alert(subject, body, TO_EMAIL)
+    # Send email (or hold it for the digest)
+    queue_alert_email('high_temp', sensor_name, subject, body, first)
 
     # Update alerts.json and mark as 'sent'
-    mark_alert_sent(sensor_name, 'high_temp') 
+    if mark:
+        mark_alert_sent(sensor_name, 'high_temp')
 
-def alert_low_temperature(sensor_name, value):
+def alert_low_temperature(sensor_name, value, first=False, mark=True):
     """
     Alert for low temperature.
     """
 
-    if not should_send_alert(sensor_name, 'low_temp'):
+    if mark and not should_send_alert(sensor_name, 'low_temp'):
         logger.info(f"Low Temp Alert Skipped (cooldown active): {value}°C")
         return
 
     subject = f"Alert: Low Temperature ({sensor_name})"
     body = f"Temperature is Low: {value}°C"
     
-    # Send email
-    send_email_alert(subject, body, TO_EMAIL)
+    # Send email (or hold it for the digest)
+    queue_alert_email('low_temp', sensor_name, subject, body, first)
 
     # Update alerts.json and mark as 'sent'
-    mark_alert_sent(sensor_name, 'low_temp') 
+    if mark:
+        mark_alert_sent(sensor_name, 'low_temp')
 
-def alert_low_light(sensor_name, value):
+def alert_low_light(sensor_name, value, first=False, mark=True):
     """
     Alert for low light.
     """
@@ -121,65 +236,66 @@ def alert_low_light(sensor_name, value):
     subject = f"Alert: Low Light ({sensor_name})"
     body = f"Light is Low: {value} Lux"
     
-    # Send email
-    send_email_alert(subject, body, TO_EMAIL)
+    # Send email (or hold it for the digest)
+    queue_alert_email('low_light', sensor_name, subject, body, first)
 
     # Update Alerts Table and mark as 'sent'
-    mark_alert_sent(sensor_name, 'low_light') 
+    if mark:
+        mark_alert_sent(sensor_name, 'low_light')
 
 def should_send_alert(sensor_name, alert_type):
     """
-    Determines if email notification should be sent based on 4hr cooldown.
-    Returns True if no previous notification or 4+ hours passed.
+    Determines if email notification should be sent based on the alert type's cooldown
+    (COOLDOWN_HOURS, 4hr by default). Returns True if no previous notification or the
+    cooldown has passed. Served from the in-memory CooldownIndex - no DB query.
     """
     # Map internal alert_type key (e.g. 'low_light') to Alert table value (e.g. 'Low Light')
-    # ALERT_TYPES = {'low_light': 'Low Light', 'low_soil_moisture': 'Low Moisture', ...}
     real_type = ALERT_TYPES.get(alert_type)
 
-    # Log which sensor/alert combo we're checking for debugging
-    logger.info(f"Checking cooldown: {sensor_name}/{alert_type} → {real_type}")
-
     # Validate alert type exists in our mapping - prevent invalid alerts
     if not real_type:
         logger.error(f"Unknown alert_type: {alert_type}")
         return False # Don't send email for unknown types
 
-    # Create Flask app context to access database (required for Flask-SQLAlchemy)
-    with current_app.app_context():
+    last_notified = cooldowns.get(sensor_name, real_type)
 
-        # Find most recent ACTIVE alert that has been notified (last_notified not null)
-        # Filters: exact sensor + alert type + has notification timestamp
-        # Orders by newest notification first
-        last_notified_alert = Alert.query.filter_by(
-            sensor_name=sensor_name, 
-            alert_type=real_type
-        ).filter(Alert.last_notified.isnot(None)).order_by(
-            Alert.last_notified.desc()
-        ).first()
-       
-        # No previous notifications found → Send first alert immediately
-        if not last_notified_alert or not last_notified_alert.last_notified:
-            logger.info("No previous alert found → SEND EMAIL")
-            return True
-
-        # Calculate hours since last notification
-        # datetime.utcnow() - last_notified = timedelta → total_seconds() / 3600 = hours
-        hours_diff = (datetime.utcnow() - last_notified_alert.last_notified).total_seconds() / 3600
-
-        # Log for debugging - shows exactly how long since last email
-        logger.info(f"Hours since last alert: {hours_diff:.1f}")
-
-        # Return True if 4+ hours passed (allows email), False if still in cooldown
-        return hours_diff > 4
+    # No previous notifications found → Send first alert immediately
+    if not last_notified:
+        logger.info(f"No previous alert found for {sensor_name}/{real_type} → SEND EMAIL")
+        return True
 
-def mark_alert_sent(sensor_name, alert_type):
+    hours_diff = (datetime.utcnow() - last_notified).total_seconds() / 3600
+    cooldown_hours = COOLDOWN_HOURS[alert_type]
+    logger.info(f"{sensor_name}/{real_type}: {hours_diff:.1f}h since last alert (cooldown {cooldown_hours}h)")
+
+    # Return True if cooldown passed (allows email), False if still in cooldown
+    return hours_diff > cooldown_hours
+
+def stage_alert_sent(sensor_names, alert_type, when):
     """
-    Updates the active Alert record with current notification timestamp.
-    Called after successfully sending email to start 4hr cooldown period.
+    Stamps last_notified on the ACTIVE alert(s) of this type for every sensor in
+    `sensor_names` with ONE UPDATE on the caller's db.session - no commit, and the
+    cooldown index is left alone until the caller has committed (then
+    cooldowns.record()). Returns rows matched.
     """
+    real_type = ALERT_TYPES.get(alert_type)
+    if not real_type:
+        logger.error(f"Unknown alert_type: {alert_type}")
+        return 0
 
+    return Alert.query.filter(
+        Alert.sensor_name.in_(list(sensor_names)),
+        Alert.alert_type == real_type,
+        Alert.status == 'active'
+    ).update({'last_notified': when}, synchronize_session=False)
+
+def mark_alert_sent(sensor_name, alert_type):
+    """
+    Stamps last_notified on the ACTIVE alert(s) for this sensor/type with one UPDATE,
+    commits, and then records it in the cooldown index (write-through).
+    Called after sending email to start the cooldown period.
+    """
     # Map internal alert_type key (e.g. 'low_light') to Alert table value (e.g. 'Low Light')
-    # ALERT_TYPES = {'low_light': 'Low Light', 'low_soil_moisture': 'Low Moisture', ...}
     real_type = ALERT_TYPES.get(alert_type)
 
     # Validate alert type mapping exists - prevent database errors
@@ -187,46 +303,20 @@ def mark_alert_sent(sensor_name, alert_type):
         logger.error(f"Unknown alert_type: {alert_type}")
         return False # Fail silently, don't crash notification flow
 
+    now = datetime.utcnow()
+
     # Create Flask app context for database access (required by Flask-SQLAlchemy)
     with current_app.app_context():
-        # Try to find MOST RECENT ACTIVE alert that was previously notified
-        # Filters: exact sensor + alert type + active status + has notification timestamp
-        # Orders by newest notification first (matches should_send_alert logic)
-        # FIRST: Try to find most recent ACTIVE + PREVIOUSLY notified alert
-        notified_alert = Alert.query.filter_by(
-            sensor_name=sensor_name, 
-            alert_type=real_type,
-            status='active' 
-        ).filter(Alert.last_notified.isnot(None)).order_by(
-            Alert.last_notified.desc()
-        ).first()
-
-        # If we found a previously notified active alert, update its timestamp
-        if notified_alert:
-            # Set current UTC timestamp to start new 4hr cooldown period
-            notified_alert.last_notified = datetime.utcnow()
-            # Save changes to database
-            db.session.commit()
-            # Log success with alert ID for debugging
-            logger.info(f"Updated repeat alert #{notified_alert.id}")
-            return True
-        
-        # SECOND: No previously notified alert? Find most recent ACTIVE alert
-        # This handles FIRST-TIME alerts (last_notified=NULL)
-        first_alert = Alert.query.filter_by(
-            sensor_name=sensor_name, 
-            alert_type=real_type,
-            status='active'
-        ).order_by(Alert.id.desc()).first()
-        
-        if first_alert:
-            # Set first notification timestamp on newly created alert
-            first_alert.last_notified = datetime.utcnow()
-            db.session.commit()
-            logger.info(f"Set first notification on alert #{first_alert.id}")
-            return True
+        updated = stage_alert_sent([sensor_name], alert_type, now)
+        db.session.commit()
 
+    # Only once the stamp is committed - a failed commit must not start a cooldown
+    cooldowns.record(sensor_name, real_type, now)
 
+    if not updated:
         # No active alert found (shouldn't happen if should_send_alert passed)
-        logger.info(f"No recent unnotified alert found")
-        return False
\ No newline at end of file
+        logger.info(f"No active alert found for {sensor_name}/{real_type}")
+        return False
+
+    logger.info(f"Marked {updated} active alert(s) notified: {sensor_name}/{real_type}")
+    return True
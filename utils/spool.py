@@ -0,0 +1,284 @@
+# utils/spool.py
+"""
+Durable local spool for sensor readings.
+
+Every cycle's readings are appended here (and fsynced) before the database is
+touched, then drained into sensor_readings with the bulk insert path. If the
+database is down the cycle still "succeeds" locally and the backlog replays,
+oldest first, as soon as it is reachable again - no readings are lost.
+
+Layout: SPOOL_DIR/seg-<first record no>.log, one record per line:
+
+    <crc32 hex> {"n": <record no>, "rows": [[timestamp, sensor_type, probe_id, value, device_id], ...]}
+
+Record numbers only ever increase. The highest one replayed is stored in the
+database (reading_spool_checkpoints, migration 007, keyed by epoch) in the SAME
+transaction as the inserted rows, so a crash between commit and segment
+cleanup never replays a record twice. The epoch is a random id written when
+the spool directory is created, so a wiped spool starts a fresh checkpoint. A torn last line from a crash mid-write fails its CRC
+and is cut off when the spool is reopened. Until that table exists the sensor
+loop skips the spool and inserts directly (checkpoint_ready()).
+"""
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import inspect
+from utils.ingest import insert_readings
+from utils.logger import get_logger
+
+logger = get_logger("app")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPOOL_ENABLED = os.getenv('SPOOL_ENABLED', 'true').lower() == 'true'
+SPOOL_DIR = os.getenv('SPOOL_DIR', os.path.join(PROJECT_ROOT, 'data', 'spool'))
+SPOOL_SEGMENT_BYTES = int(os.getenv('SPOOL_SEGMENT_BYTES', str(1024 * 1024)))
+# 0 = fsync every append (one per sensor cycle); >0 = at most one fsync per this many seconds
+SPOOL_FSYNC_SECS = float(os.getenv('SPOOL_FSYNC_SECS', '0'))
+# Cap per drain so a long outage's backlog replays over a few cycles, not one huge transaction
+SPOOL_DRAIN_MAX_ROWS = int(os.getenv('SPOOL_DRAIN_MAX_ROWS', '50000'))
+
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _encode(n: int, rows: List[Dict]) -> bytes:
+    payload = json.dumps({'n': n, 'rows': [
+        [r['timestamp'].strftime(_TS_FORMAT), r['sensor_type'], r.get('probe_id'), r['value'], r.get('device_id')]
+        for r in rows
+    ]}, separators=(',', ':'))
+    return f"{zlib.crc32(payload.encode()):08x} {payload}\n".encode()
+
+
+def _decode(line: bytes) -> Optional[Dict]:
+    """Record dict, or None for a torn/corrupt line"""
+    if not line.endswith(b'\n') or len(line) < 10:
+        return None
+    crc, payload = line[:8], line[9:-1]
+    try:
+        if int(crc, 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+class ReadingSpool:
+    """Segmented append-only log of reading batches with fsync batching."""
+
+    def __init__(self, directory: str = SPOOL_DIR, segment_bytes: int = SPOOL_SEGMENT_BYTES,
+                 fsync_secs: float = SPOOL_FSYNC_SECS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_secs = fsync_secs
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_path = None
+        self._epoch = None
+        self._next_n = None
+        self._last_fsync = 0.0
+        self._dirty = False
+
+    # =============================
+    # SEGMENTS
+    # =============================
+    def segments(self) -> List[Tuple[int, str]]:
+        """(first record no, path) for every segment, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith('seg-') and name.endswith('.log'):
+                try:
+                    found.append((int(name[4:-4]), os.path.join(self.directory, name)))
+                except ValueError:
+                    continue
+        return sorted(found)
+
+    def _read_segment(self, path: str) -> Iterator[Tuple[int, Dict]]:
+        """(end offset, record) for each valid record; stops at the first bad line"""
+        offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                record = _decode(line)
+                if record is None:
+                    return
+                offset += len(line)
+                yield offset, record
+
+    def _recover(self):
+        """First use: load the epoch, find the next record number, cut any torn tail off the last segment"""
+        os.makedirs(self.directory, exist_ok=True)
+        epoch_path = os.path.join(self.directory, 'epoch')
+        if not os.path.exists(epoch_path):
+            with open(epoch_path, 'w') as f:
+                f.write(uuid.uuid4().hex[:12])
+                f.flush()
+                os.fsync(f.fileno())
+            self._sync_dir()
+        with open(epoch_path) as f:
+            self._epoch = f.read().strip()
+
+        segments = self.segments()
+        self._next_n = 1
+        if not segments:
+            return
+        first_n, path = segments[-1]
+        good, last_n = 0, first_n - 1
+        for good, record in self._read_segment(path):
+            last_n = record['n']
+        if good < os.path.getsize(path):
+            logger.warning(f"Spool: truncating torn tail of {path} at byte {good}")
+            with open(path, 'r+b') as f:
+                f.truncate(good)
+                os.fsync(f.fileno())
+        self._next_n = last_n + 1
+
+    def _sync_dir(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @property
+    def epoch(self) -> str:
+        with self._lock:
+            if self._next_n is None:
+                self._recover()
+            return self._epoch
+
+    # =============================
+    # APPEND
+    # =============================
+    def append(self, rows: List[Dict]) -> Optional[int]:
+        """Durably log one batch of reading rows (see utils.ingest.reading_row). Returns its record no."""
+        if not rows:
+            return None
+        with self._lock:
+            if self._next_n is None:
+                self._recover()
+            n = self._next_n
+
+            if self._file is None or self._file.tell() >= self.segment_bytes:
+                if self._file is not None:
+                    self._fsync()
+                    self._file.close()
+                self._file_path = os.path.join(self.directory, f"seg-{n:012d}.log")
+                self._file = open(self._file_path, 'ab')
+                self._sync_dir()  # the new file's directory entry must survive a crash too
+
+            self._file.write(_encode(n, rows))
+            self._file.flush()
+            self._dirty = True
+            self._next_n = n + 1
+            if time.monotonic() - self._last_fsync >= self.fsync_secs:
+                self._fsync()
+            return n
+
+    def _fsync(self):
+        if self._file is not None and self._dirty:
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def sync(self):
+        """Force any batched appends to disk"""
+        with self._lock:
+            self._fsync()
+
+    # =============================
+    # DRAIN
+    # =============================
+    def pending(self, after_n: int, max_rows: int = SPOOL_DRAIN_MAX_ROWS) -> Tuple[List[Dict], int]:
+        """Rows of records numbered above after_n (whole records, about max_rows) and the last record no"""
+        rows, last_n = [], after_n
+        segments = self.segments()
+        for i, (first_n, path) in enumerate(segments):
+            if i + 1 < len(segments) and segments[i + 1][0] - 1 <= after_n:
+                continue  # everything in this segment is already in the DB
+            for _, record in self._read_segment(path):
+                if record['n'] <= after_n:
+                    continue
+                # Records written before device_id was spooled have four fields
+                rows.extend({
+                    'timestamp': datetime.strptime(row[0], _TS_FORMAT),
+                    'sensor_type': row[1], 'probe_id': row[2], 'value': row[3],
+                    'device_id': row[4] if len(row) > 4 else None,
+                } for row in record['rows'])
+                last_n = record['n']
+                if len(rows) >= max_rows:
+                    return rows, last_n
+        return rows, last_n
+
+    def discard(self, upto_n: int):
+        """Delete segments whose records are all <= upto_n (i.e. committed to the DB)"""
+        with self._lock:
+            if self._next_n is None:
+                self._recover()
+            segments = self.segments()
+            for i, (first_n, path) in enumerate(segments):
+                if i + 1 < len(segments):
+                    done = segments[i + 1][0] - 1 <= upto_n
+                else:
+                    done = self._next_n is not None and self._next_n - 1 <= upto_n
+                if not done:
+                    continue
+                if path == self._file_path:
+                    self._file.close()
+                    self._file = self._file_path = None
+                os.unlink(path)
+
+    def backlog_bytes(self) -> int:
+        return sum(os.path.getsize(path) for _, path in self.segments())
+
+
+_checkpoint_ready = None  # True once the table is seen; False after the first "missing" warning
+
+def checkpoint_ready(session) -> bool:
+    """
+    True if reading_spool_checkpoints exists, so drain() can run. Checked until it
+    is first seen; if the DB can't be reached the answer is True - spooling is
+    exactly what an outage needs, and drain() then fails with the rest of the cycle.
+    """
+    global _checkpoint_ready
+    if _checkpoint_ready:
+        return True
+    from models.spool import SpoolCheckpoint
+    try:
+        ready = inspect(session.get_bind()).has_table(SpoolCheckpoint.__tablename__)
+    except Exception:
+        return True
+    if not ready and _checkpoint_ready is None:
+        logger.error("Reading spool off: table reading_spool_checkpoints is missing "
+                     "(run scripts/migration_scripts/007_create_spool_checkpoints.py) - inserting directly")
+    _checkpoint_ready = ready
+    return ready
+
+
+def drain(session, spool: 'ReadingSpool', max_rows: int = SPOOL_DRAIN_MAX_ROWS) -> Tuple[int, int]:
+    """
+    Stage spooled rows newer than the DB checkpoint into `session` (bulk insert)
+    and advance the checkpoint - the caller commits both together, then calls
+    spool.discard(last_n). Returns (rows staged, last record no).
+    """
+    from models.spool import SpoolCheckpoint
+
+    checkpoint = session.get(SpoolCheckpoint, spool.epoch)
+    if checkpoint is None:
+        checkpoint = SpoolCheckpoint(epoch=spool.epoch, last_n=0)
+        session.add(checkpoint)
+
+    rows, last_n = spool.pending(checkpoint.last_n, max_rows)
+    if rows:
+        insert_readings(session, rows)
+    if last_n != checkpoint.last_n:
+        checkpoint.last_n = last_n
+        checkpoint.updated_at = datetime.utcnow()
+    return len(rows), last_n
+
+
+spool = ReadingSpool()